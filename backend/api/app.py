@@ -4,58 +4,187 @@ Connects the frontend UI to the backend ML models
 Supports: Unified analysis with corpus + web search + AI detection
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 import os
 import sys
+import io
 import time
-import tempfile
-import docx
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import json
-from PyPDF2 import PdfReader
+import numpy as np
+import scipy.sparse as sp
+from werkzeug.datastructures import FileStorage
 from nltk.tokenize import sent_tokenize
 
 # Add parent directory to path to import backend modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from backend.ml_models.plagiarism_detector import PlagiarismDetector, download_nltk_resources
-from backend.api.web_search import WebSearchManager, AIContentScanner
+from backend.ml_models.plagiarism_detector import (CROSS_PAIR_THRESHOLD, PlagiarismDetector, SimilarityCalculator, TextPreprocessor,
+                                                  download_nltk_resources, preprocess_many)
+from backend.ml_models.corpus_index import CorpusIndex
+from backend.ml_models.sharded_search import ShardedSearcher, summarize_scores
+from backend.api.web_search import WebSearchManager, AIContentScanner, get_search_cache
+from backend.api.jobs import JobManager, QueueFullError
+from backend.api.result_cache import AnalysisResultCache, text_hash
+from backend.database.preprocess_cache import PreprocessCache
+from backend.database.corpus_builder import CorpusDatabase
+from backend.database.web_ingestor import WebAbstractIngestor, load_web_papers
+from backend.database.corpus_loader import exported_paper_ids, iter_corpus_batches, stored_paper_ids
+from backend.database.history_store import HistoryStore, HISTORY_DB_FILE, DEFAULT_PAGE_SIZE
+from backend.utils.text_extractor import DocumentTooLargeError, extract_text, open_bounded
+from backend.utils.process_pool import new_process_pool
 
 # Initialize Flask to serve frontend
 app = Flask(__name__, static_folder='../../frontend1/dist', static_url_path='')
-CORS(app)
+CORS(app, expose_headers=['X-Total-Count', 'X-Next-Offset'])
 
 # Corpus path
 CORPUS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../corpus'))
 
+# Number of matches returned per analysis
+TOP_MATCHES = 10
 
-def load_corpus():
-    """Load all documents from the corpus directory"""
-    documents = []
-    names = []
+# Processes used to preprocess the corpus on cold start (None = all cores)
+PREPROCESS_WORKERS = None
+
+# Regex/memoized preprocessing path (same output, see tools/benchmark_preprocess.py)
+FAST_PREPROCESSING = True
+
+# Pre-select corpus candidates by shared winnowing fingerprints before cosine scoring.
+# Keeps per-request cost flat for very large corpora, at the cost of missing
+# documents that are only topically similar (no shared passages).
+CANDIDATE_RETRIEVAL = False
+FINGERPRINT_CANDIDATES = 200
+
+# Pre-select candidates by LSA + IVF approximate nearest neighbours instead (see
+# backend/ml_models/ann_index.py and tools/benchmark_ann.py for recall vs. latency).
+# Catches topical overlap that fingerprints miss, but is approximate: a relevant paper
+# outside the probed lists is not scored. Ignored when CANDIDATE_RETRIEVAL found candidates.
+ANN_RETRIEVAL = False
+ANN_CANDIDATES = 200
+
+# Or pre-select them with a BM25 full-text query over the corpus database (SQLite FTS5).
+# Only documents backed by a papers row (exported corpus files, stored web abstracts) can be found.
+FTS_RETRIEVAL = False
+FTS_CANDIDATES = 200
+
+# Run web search and AI detection alongside corpus scoring within a request.
+# AI detection (NLTK POS tagging) is CPU-bound and goes to a process pool (None = in a thread).
+CONCURRENT_STAGES = True
+AI_DETECTION_PROCESSES = 2
+
+# Upload limits (larger PDFs are extracted page-parallel, see backend/utils/text_extractor.py)
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+MAX_PDF_PAGES = 500
+
+# Score the corpus in SEARCH_SHARDS worker processes over a memory-mapped matrix
+# (None = one per core). Worth it once the corpus reaches tens of thousands of papers.
+SHARDED_SEARCH = False
+SEARCH_SHARDS = None
+
+# Reuse finished analyses of identical extracted text (duplicate uploads return at once).
+# Entries are dropped whenever corpus files change (startup build, sync, reload); web abstracts
+# ingested in the meantime only show up once an entry expires, like the web search cache.
+RESULT_CACHE = True
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 3600
+
+# Analysis history records kept in the SQLite store (None = keep everything)
+HISTORY_RETENTION = 10000
+
+# Batch endpoint: max uploads per request, and the lowest submission-vs-submission similarity
+# reported (defaults to the CLI checker's threshold, so both list the same pairs)
+MAX_BATCH_FILES = 100
+BATCH_CROSS_THRESHOLD = CROSS_PAIR_THRESHOLD
+
+# Analyses run concurrently by the job queue (POST /api/jobs)
+JOB_WORKERS = 2
+
+# Keep the fitted index on disk (memory-mapped on load) so restarts and extra
+# worker processes open it instead of re-reading and refitting the corpus
+PERSISTENT_INDEX = True
+INDEX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../database/corpus_index'))
+
+# Store web search hits in the corpus database and add them to the live index (write-behind)
+PERSIST_WEB_RESULTS = True
+CORPUS_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../database/corpus_database.db'))
+
+# Where the reference corpus comes from: 'files' reads corpus/<category>/*.txt, 'database'
+# streams the papers table of CORPUS_DB_PATH in batches (one sequential read). In database
+# mode, files whose names match what CorpusBuilder.export_to_files writes for a row are
+# skipped as duplicates of it; hand-added .txt files are still read. Stays opt-in because
+# matches then carry the rows' titles and topics instead of the corpus/<category>/ layout.
+CORPUS_SOURCE = 'files'
+
+# Seconds between corpus directory rescans (None disables the watcher; POST /api/corpus/sync still works)
+CORPUS_WATCH_INTERVAL = None
+
+
+def exported_corpus_files():
+    """{file name: paper id} for corpus files written by CorpusBuilder.export_to_files, from the database rows"""
+    try:
+        return exported_paper_ids(CORPUS_DB_PATH)
+    except Exception as e:
+        print(f"Warning: Could not read exported paper names from {CORPUS_DB_PATH} ({e})")
+        return {}
+
+
+def scan_corpus_files():
+    """Map every corpus .txt file to (category, mtime); top-level files (e.g. corpus builder exports) are 'uncategorized'"""
+    files = {}
     
     if not os.path.exists(CORPUS_PATH):
         print(f"Warning: Corpus path does not exist: {CORPUS_PATH}")
-        return documents, names
+        return files
     
-    for category in os.listdir(CORPUS_PATH):
-        category_path = os.path.join(CORPUS_PATH, category)
-        if os.path.isdir(category_path):
-            for filename in os.listdir(category_path):
+    for entry in os.listdir(CORPUS_PATH):
+        entry_path = os.path.join(CORPUS_PATH, entry)
+        if os.path.isdir(entry_path):
+            for filename in os.listdir(entry_path):
                 if filename.endswith('.txt'):
-                    filepath = os.path.join(category_path, filename)
-                    try:
-                        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            if content.strip():
-                                documents.append(content)
-                                names.append({
-                                    'title': filename.replace('.txt', '').replace('_', ' ').title(),
-                                    'category': category,
-                                    'filepath': filepath
-                                })
-                    except Exception as e:
-                        print(f"Error loading {filepath}: {e}")
+                    filepath = os.path.join(entry_path, filename)
+                    files[filepath] = (entry, os.path.getmtime(filepath))
+        elif entry.endswith('.txt'):
+            files[entry_path] = ('uncategorized', os.path.getmtime(entry_path))
+    
+    if CORPUS_SOURCE == 'database':
+        # Exported papers are served from their database rows
+        exported = exported_corpus_files()
+        files = {path: info for path, info in files.items() if os.path.basename(path) not in exported}
+    
+    return files
+
+
+def load_corpus(files=None):
+    """Load documents from the corpus directory (all files, or only the given scan_corpus_files() entries)"""
+    documents = []
+    names = []
+    
+    if files is None:
+        files = scan_corpus_files()
+    exported = exported_corpus_files() if files else {}
+    
+    for filepath, (category, mtime) in files.items():
+        filename = os.path.basename(filepath)
+        try:
+            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+                if content.strip():
+                    documents.append(content)
+                    name = {
+                        'title': filename.replace('.txt', '').replace('_', ' ').title(),
+                        'category': category,
+                        'filepath': filepath,
+                        'mtime': mtime
+                    }
+                    if filename in exported:
+                        name['paper_id'] = exported[filename]
+                    names.append(name)
+        except Exception as e:
+            print(f"Error loading {filepath}: {e}")
     
     return documents, names
 
@@ -64,69 +193,275 @@ def load_corpus():
 _CACHED_CORPUS_DOCS = None
 _CACHED_CORPUS_NAMES = None
 _CACHED_PREPROCESSED_CORPUS = None
+_CORPUS_INDEX = None
+# Bumped whenever corpus files are (re)indexed; analysis results are cached per version
+_CORPUS_VERSION = 0
+_RESULT_CACHE = None
+_WEB_INGESTOR = None
+_WEB_INGESTOR_LOCK = threading.Lock()
+# Held while the corpus index is created, rebuilt or synced, so concurrent requests, the
+# watcher and the web ingestor never build it twice or apply the same change twice
+_CORPUS_LOCK = threading.RLock()
 
 def get_cached_corpus():
     global _CACHED_CORPUS_DOCS, _CACHED_CORPUS_NAMES, _CACHED_PREPROCESSED_CORPUS
     if _CACHED_CORPUS_DOCS is None:
         print("📚 Loading and preprocessing corpus for the first time... This may take a minute.")
-        _CACHED_CORPUS_DOCS, _CACHED_CORPUS_NAMES = load_corpus()
-        preprocessor = PlagiarismDetector().preprocessor
-        _CACHED_PREPROCESSED_CORPUS = [
-            preprocessor.preprocess(doc) for doc in _CACHED_CORPUS_DOCS
-        ]
+        documents, names = load_corpus()
+        preprocessor = TextPreprocessor(fast=FAST_PREPROCESSING)
+        if CORPUS_SOURCE == 'database':
+            preprocessed = preprocess_with_cache(documents, preprocessor) if documents else []
+            streamed = 0
+            for batch_docs, batch_names in iter_corpus_batches(CORPUS_DB_PATH, include_web=PERSIST_WEB_RESULTS):
+                documents += batch_docs
+                names += batch_names
+                preprocessed += preprocess_with_cache(batch_docs, preprocessor)
+                streamed += len(batch_docs)
+            print(f"   ✓ Streamed {streamed} papers from {CORPUS_DB_PATH}")
+        else:
+            if PERSIST_WEB_RESULTS:
+                web_docs, web_names = load_web_papers(CORPUS_DB_PATH)
+                if web_docs:
+                    print(f"   ✓ Including {len(web_docs)} stored web abstracts")
+                documents += web_docs
+                names += web_names
+            preprocessed = preprocess_with_cache(documents, preprocessor)
+        _CACHED_CORPUS_DOCS, _CACHED_CORPUS_NAMES, _CACHED_PREPROCESSED_CORPUS = documents, names, preprocessed
         print("✓ Corpus preprocessing complete.")
     return _CACHED_CORPUS_DOCS, _CACHED_CORPUS_NAMES, _CACHED_PREPROCESSED_CORPUS
 
 
-def extract_text_from_file(file):
-    """Extract text from uploaded file (supports .txt, .pdf, .docx)"""
-    filename = file.filename.lower()
-    
-    if filename.endswith('.txt'):
-        return file.read().decode('utf-8', errors='ignore')
-    
-    elif filename.endswith('.pdf'):
-        # Save to temp file and read with PyPDF2
-        # Use mkstemp to avoid Windows file locking issues
-        fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
-        os.close(fd) # Close the file handle immediately
-        
+def preprocess_with_cache(documents, preprocessor):
+    """Preprocess documents, reusing the on-disk cache keyed by content hash"""
+    try:
+        cache = PreprocessCache()
         try:
-            file.save(tmp_path)
-            text = ""
-            reader = PdfReader(tmp_path)
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            return text
+            preprocessed, misses = cache.preprocess(documents, preprocessor, workers=PREPROCESS_WORKERS)
         finally:
-            try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except Exception as e:
-                print(f"Warning: Could not remove temp file {tmp_path}: {e}")
+            cache.close()
+        print(f"   ✓ Preprocess cache: {len(documents) - misses} hits, {misses} misses")
+        return preprocessed
+    except Exception as e:
+        print(f"Warning: Preprocess cache unavailable ({e}), preprocessing without it")
+        return preprocess_many(documents, workers=PREPROCESS_WORKERS, preprocessor=preprocessor)
+
+
+def new_corpus_index():
+    # A saved index built from another corpus source (or with / without web papers) is rebuilt, not reused
+    source = {'corpus_source': CORPUS_SOURCE, 'persist_web_results': PERSIST_WEB_RESULTS}
+    return CorpusIndex(max_features=5000, fast=FAST_PREPROCESSING, use_fingerprints=CANDIDATE_RETRIEVAL,
+                       use_ann=ANN_RETRIEVAL, source=source)
+
+
+def save_corpus_index(index):
+    """Persist the index for the next start / other worker processes (best effort)"""
+    if not PERSISTENT_INDEX or not index.is_built:
+        return
+    try:
+        index.save(INDEX_DIR)
+        print(f"💾 Saved corpus index to {INDEX_DIR}")
+    except Exception as e:
+        print(f"Warning: Could not save corpus index ({e})")
+
+
+def load_corpus_index():
+    """The saved index if it exists and matches the current settings, else None"""
+    if not PERSISTENT_INDEX:
+        return None
+    try:
+        return CorpusIndex.load(INDEX_DIR, use_fingerprints=CANDIDATE_RETRIEVAL, use_ann=ANN_RETRIEVAL,
+                               expected=new_corpus_index().params())
+    except Exception as e:
+        print(f"Warning: Could not load saved corpus index ({e}), rebuilding")
+        return None
+
+
+def get_corpus_index():
+    """Return the pre-fitted corpus TF-IDF index, opening the saved one or fitting it on first use"""
+    global _CORPUS_INDEX, _CACHED_CORPUS_DOCS, _CACHED_CORPUS_NAMES, _CACHED_PREPROCESSED_CORPUS
+    if _CORPUS_INDEX is not None:
+        return _CORPUS_INDEX
+    with _CORPUS_LOCK:
+        if _CORPUS_INDEX is not None:
+            return _CORPUS_INDEX
+        
+        index = load_corpus_index()
+        if index is not None:
+            print(f"📂 Opened saved corpus index ({len(index)} documents)")
+            _CORPUS_INDEX = index
+            _CACHED_CORPUS_DOCS = index.documents
+            _CACHED_CORPUS_NAMES = index.names
+            _CACHED_PREPROCESSED_CORPUS = index.preprocessed_docs
+            bump_corpus_version()
+            # Catch up with corpus files / stored web papers that changed since it was saved
+            sync_corpus()
+            return _CORPUS_INDEX
+        
+        corpus_docs, corpus_names, preprocessed_corpus = get_cached_corpus()
+        index = new_corpus_index()
+        if corpus_docs:
+            print("🧮 Fitting corpus TF-IDF index...")
+            index.build(corpus_docs, corpus_names, preprocessed_corpus)
+            print(f"✓ Corpus index ready ({len(index.get_feature_names())} features).")
+            save_corpus_index(index)
+        _CORPUS_INDEX = index
+        bump_corpus_version()
+        return _CORPUS_INDEX
+
+
+def reload_corpus():
+    """Drop the cached corpus and index so they are rebuilt from scratch (call after the corpus changes)"""
+    global _CACHED_CORPUS_DOCS, _CACHED_CORPUS_NAMES, _CACHED_PREPROCESSED_CORPUS, _CORPUS_INDEX
+    with _CORPUS_LOCK:
+        _CACHED_CORPUS_DOCS = None
+        _CACHED_CORPUS_NAMES = None
+        _CACHED_PREPROCESSED_CORPUS = None
+        
+        corpus_docs, corpus_names, preprocessed_corpus = get_cached_corpus()
+        index = new_corpus_index()
+        if corpus_docs:
+            index.build(corpus_docs, corpus_names, preprocessed_corpus)
+            save_corpus_index(index)
+        _CORPUS_INDEX = index
+        bump_corpus_version()
+        return index
+
+
+def bump_corpus_version():
+    """Mark the corpus as changed, invalidating cached analysis results"""
+    global _CORPUS_VERSION
+    _CORPUS_VERSION += 1
+    if _RESULT_CACHE is not None:
+        _RESULT_CACHE.invalidate(_CORPUS_VERSION)
+
+
+def get_result_cache():
+    global _RESULT_CACHE
+    if _RESULT_CACHE is None:
+        _RESULT_CACHE = AnalysisResultCache(max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+    return _RESULT_CACHE
+
+
+def sync_corpus():
+    """Apply added, changed and deleted corpus files (and new / deleted papers rows) to the live index without a full rebuild"""
+    global _CACHED_CORPUS_DOCS, _CACHED_CORPUS_NAMES, _CACHED_PREPROCESSED_CORPUS
+    corpus_index = get_corpus_index()
     
-    elif filename.endswith('.docx'):
-        # Save to temp file and read with python-docx
-        # Use mkstemp to avoid Windows file locking issues
-        fd, tmp_path = tempfile.mkstemp(suffix='.docx')
-        os.close(fd)
+    # Scan, diff and apply as one step: concurrent syncs would each add the same new files
+    with _CORPUS_LOCK:
+        on_disk = scan_corpus_files()
+        indexed = {name.get('filepath'): name.get('mtime') for name in corpus_index.names}
         
-        try:
-            file.save(tmp_path)
-            doc = docx.Document(tmp_path)
-            text = ""
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-            return text
-        finally:
+        stale = {path for path, mtime in indexed.items() if on_disk.get(path, (None, None))[1] != mtime}
+        fresh = {path: info for path, info in on_disk.items() if indexed.get(path) != info[1]}
+        
+        new_docs, new_names = [], []
+        # Row-backed entries (no filepath) stay only while the current mode would still load their row
+        indexed_ids = {name['paper_id'] for name in corpus_index.names
+                       if name.get('paper_id') is not None and 'filepath' not in name}
+        if CORPUS_SOURCE == 'database':
+            # Every papers row is indexed: pick up rows inserted or deleted since
+            stored_ids = stored_paper_ids(CORPUS_DB_PATH, include_web=PERSIST_WEB_RESULTS)
+            deleted_ids = indexed_ids - stored_ids
+            new_ids = stored_ids - indexed_ids
+            if new_ids:
+                for batch_docs, batch_names in iter_corpus_batches(CORPUS_DB_PATH, include_web=PERSIST_WEB_RESULTS,
+                                                                   paper_ids=new_ids):
+                    new_docs += batch_docs
+                    new_names += batch_names
+        else:
+            # Files mode only adds stored web abstracts to the files
+            stored_docs, stored_names = load_web_papers(CORPUS_DB_PATH) if PERSIST_WEB_RESULTS else ([], [])
+            deleted_ids = indexed_ids - {name['paper_id'] for name in stored_names}
+            indexed_hashes = {name.get('content_hash') for name in corpus_index.names}
+            for doc, name in zip(stored_docs, stored_names):
+                if name['content_hash'] not in indexed_hashes:
+                    new_docs.append(doc)
+                    new_names.append(name)
+        
+        if not stale and not fresh and not new_docs and not deleted_ids:
+            return {'added': 0, 'removed': 0, 'rebuilt': False, 'corpus_size': len(corpus_index)}
+        
+        if len(stale) + len(deleted_ids) >= len(corpus_index):
+            # Nothing survives; a fresh build is the incremental update
+            return {'added': len(fresh) + len(new_docs), 'removed': len(stale) + len(deleted_ids), 'rebuilt': True, 'corpus_size': len(reload_corpus())}
+        
+        documents, names = load_corpus(fresh)
+        documents += new_docs
+        names += new_names
+        preprocessed = preprocess_with_cache(documents, corpus_index.preprocessor)
+        
+        with corpus_index.lock:
+            removed = corpus_index.remove_documents(
+                lambda name: name.get('filepath') in stale
+                             or ('filepath' not in name and name.get('paper_id') in deleted_ids)
+            )
+            added = corpus_index.add_documents(documents, names, preprocessed)
+            
+            rebuilt = corpus_index.needs_rebuild
+            if rebuilt:
+                print("🧮 Corpus drifted since last fit, refitting TF-IDF vocabulary...")
+                corpus_index.build(corpus_index.documents, corpus_index.names, corpus_index.preprocessed_docs)
+            
+            _CACHED_CORPUS_DOCS = corpus_index.documents
+            _CACHED_CORPUS_NAMES = corpus_index.names
+            _CACHED_PREPROCESSED_CORPUS = corpus_index.preprocessed_docs
+        
+        print(f"🔄 Corpus sync: +{added} / -{removed} documents ({len(corpus_index)} total)")
+        save_corpus_index(corpus_index)
+        bump_corpus_version()
+        return {'added': added, 'removed': removed, 'rebuilt': rebuilt, 'corpus_size': len(corpus_index)}
+
+
+def add_web_papers_to_index(documents, names):
+    """Ingestor callback: append newly stored web abstracts to the live index"""
+    global _CACHED_CORPUS_DOCS, _CACHED_CORPUS_NAMES, _CACHED_PREPROCESSED_CORPUS
+    corpus_index = get_corpus_index()
+    preprocessed = corpus_index.preprocess(documents)
+    
+    with _CORPUS_LOCK, corpus_index.lock:
+        if corpus_index.is_built:
+            corpus_index.add_documents(documents, names, preprocessed)
+            if corpus_index.needs_rebuild:
+                corpus_index.build(corpus_index.documents, corpus_index.names, corpus_index.preprocessed_docs)
+        else:
+            corpus_index.build(documents, names, preprocessed)
+        
+        _CACHED_CORPUS_DOCS = corpus_index.documents
+        _CACHED_CORPUS_NAMES = corpus_index.names
+        _CACHED_PREPROCESSED_CORPUS = corpus_index.preprocessed_docs
+    
+    print(f"🗄️  Stored {len(documents)} new web abstracts ({len(corpus_index)} corpus documents)")
+
+
+def get_web_ingestor():
+    """Process-wide write-behind ingestor for web search results"""
+    global _WEB_INGESTOR
+    with _WEB_INGESTOR_LOCK:
+        if _WEB_INGESTOR is None:
+            known = {name['content_hash'] for name in get_corpus_index().names if name.get('content_hash')}
+            _WEB_INGESTOR = WebAbstractIngestor(CORPUS_DB_PATH, on_added=add_web_papers_to_index, known_hashes=known)
+        return _WEB_INGESTOR
+
+
+def start_corpus_watcher(interval):
+    """Poll the corpus directory in a daemon thread and sync changes into the index"""
+    def watch():
+        while True:
+            time.sleep(interval)
             try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+                sync_corpus()
             except Exception as e:
-                print(f"Warning: Could not remove temp file {tmp_path}: {e}")
+                print(f"Corpus watcher error: {e}")
     
-    else:
-        raise ValueError(f"Unsupported file type: {filename}")
+    thread = threading.Thread(target=watch, name='corpus-watcher', daemon=True)
+    thread.start()
+    return thread
+
+
+def extract_text_from_file(file):
+    """Extract text from uploaded file (supports .txt, .pdf, .docx), streamed and size-limited"""
+    return extract_text(file, max_bytes=MAX_UPLOAD_BYTES, max_pages=MAX_PDF_PAGES)
 
 
 @app.route('/')
@@ -135,246 +470,718 @@ def index():
     return app.send_static_file('index.html')
 
 
-# History File Path
+# Legacy JSON history, imported into the SQLite history store on first use
 HISTORY_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../history.json'))
+HISTORY_DB_PATH = HISTORY_DB_FILE
 
-def load_history_data():
-    """Load history from JSON file"""
-    if not os.path.exists(HISTORY_FILE):
-        return []
-    try:
-        with open(HISTORY_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
+_HISTORY_STORE = None
+_HISTORY_LOCK = threading.Lock()
+
+def get_history_store():
+    """Process-wide SQLite history store"""
+    global _HISTORY_STORE
+    with _HISTORY_LOCK:
+        if _HISTORY_STORE is None:
+            _HISTORY_STORE = HistoryStore(HISTORY_DB_PATH, max_records=HISTORY_RETENTION, legacy_file=HISTORY_FILE)
+    return _HISTORY_STORE
 
 def save_to_history(record):
     """Save a new record to history"""
-    history = load_history_data()
-    # Add timestamp and ID
-    record['id'] = str(int(time.time() * 1000))
-    record['timestamp'] = time.strftime('%Y-%m-%d %H:%M:%S')
-    
-    # Prepend new record (newest first)
-    history.insert(0, record)
-    
-    # Keep last 50 records
-    history = history[:50]
-    
     try:
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=2)
+        get_history_store().add(record)
     except Exception as e:
         print(f"Error saving history: {e}")
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    """Get analysis history"""
-    return jsonify(load_history_data())
+    """Get analysis history, newest first (?limit=&offset=&fileName=&since=&until=)"""
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    
+    records, total = get_history_store().page(
+        limit=limit,
+        offset=offset,
+        file_name=request.args.get('fileName'),
+        since=request.args.get('since'),
+        until=request.args.get('until')
+    )
+    # The body stays a plain list for existing clients; paging info goes in headers
+    response = jsonify(records)
+    response.headers['X-Total-Count'] = str(total)
+    if offset + len(records) < total:
+        response.headers['X-Next-Offset'] = str(offset + len(records))
+    return response
 
 @app.route('/api/history', methods=['DELETE'])
 def clear_history():
     """Clear analysis history"""
     try:
-        if os.path.exists(HISTORY_FILE):
-            os.remove(HISTORY_FILE)
+        get_history_store().clear()
         return jsonify({'message': 'History cleared'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/analyze', methods=['POST'])
-def analyze_document():
+class AnalysisError(Exception):
+    """Analysis failure caused by the submission or corpus state, with the HTTP status to report"""
+    
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+_AI_PROCESS_POOL = None
+_AI_POOL_LOCK = threading.Lock()
+
+def get_ai_process_pool():
+    """Process pool shared by every request's AI detection (created once)"""
+    global _AI_PROCESS_POOL
+    with _AI_POOL_LOCK:
+        if _AI_PROCESS_POOL is None:
+            _AI_PROCESS_POOL = new_process_pool(AI_DETECTION_PROCESSES)
+        return _AI_PROCESS_POOL
+
+
+def reset_ai_process_pool(pool):
+    """Shut down a broken pool so the next request starts a fresh one"""
+    global _AI_PROCESS_POOL
+    with _AI_POOL_LOCK:
+        if _AI_PROCESS_POOL is pool:
+            _AI_PROCESS_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_ai_detection(text):
+    """AIContentScanner.analyze, in the shared process pool when enabled"""
+    if AI_DETECTION_PROCESSES:
+        pool = None
+        try:
+            pool = get_ai_process_pool()
+            return pool.submit(AIContentScanner.analyze, text).result()
+        except BrokenProcessPool as e:
+            print(f"Warning: AI detection process pool broke ({e}), restarting it and running in-process")
+            reset_ai_process_pool(pool)
+        except Exception as e:
+            print(f"Warning: AI detection process pool failed ({e}), running in-process")
+    return AIContentScanner.analyze(text)
+
+
+def search_web(submitted_text):
+    """Web abstracts related to the submission, as (documents, names)"""
+    search_manager = WebSearchManager()
+    web_papers = search_manager.search_all(text_content=submitted_text, max_per_source=3)
+    if PERSIST_WEB_RESULTS:
+        # Stored in the background; abstracts already in the index are not scored twice
+        ingestor = get_web_ingestor()
+        ingestor.submit(web_papers)
+        web_papers = [paper for paper in web_papers if not ingestor.is_known(paper)]
+    web_docs, web_metadata = search_manager.prepare_for_analysis(web_papers)
+    
+    web_names = [{
+        'title': meta['title'],
+        'category': f"Web - {meta['source']}",
+        'authors': meta.get('authors', ''),
+        'url': meta.get('url', '')
+    } for meta in web_metadata]
+    return web_docs, web_names
+
+
+class ImmediateFuture:
+    """Stand-in future that runs its function on result() (sequential mode)"""
+    
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+    
+    def result(self):
+        return self.func(*self.args)
+
+
+_FTS_DATABASE = None
+_FTS_LOCK = threading.Lock()
+
+def search_fts_candidates(text, limit):
+    """Ids of the papers a BM25 full-text query on the text ranks highest, or None if unavailable"""
+    global _FTS_DATABASE
+    if not os.path.exists(CORPUS_DB_PATH):
+        return None
+    try:
+        # One read-only connection per process, shared by every request
+        with _FTS_LOCK:
+            if _FTS_DATABASE is None:
+                # A read-write open first creates (or migrates to) the full-text index
+                CorpusDatabase(CORPUS_DB_PATH).close()
+                _FTS_DATABASE = CorpusDatabase(CORPUS_DB_PATH, read_only=True)
+            return _FTS_DATABASE.search_candidates(text, limit=limit)
+    except Exception as e:
+        print(f"Warning: Full-text candidate search failed ({e})")
+        return None
+
+
+_SHARDED_SEARCHER = None
+_SHARDED_SEARCHER_LOCK = threading.Lock()
+
+def get_sharded_searcher():
+    """Process-wide shard searcher (created once, so no extra pool or matrix directory is leaked)"""
+    global _SHARDED_SEARCHER
+    with _SHARDED_SEARCHER_LOCK:
+        if _SHARDED_SEARCHER is None:
+            _SHARDED_SEARCHER = ShardedSearcher(shards=SEARCH_SHARDS)
+        return _SHARDED_SEARCHER
+
+def score_corpus(corpus_matrix, query_matrix, sharded=False):
+    """summarize_scores() of each query row against the corpus, across shard processes when enabled"""
+    if sharded:
+        try:
+            return get_sharded_searcher().search(corpus_matrix, query_matrix, TOP_MATCHES)
+        except Exception as e:
+            print(f"Warning: Sharded search failed ({e}), scoring in-process")
+    
+    # One-to-many scoring: a single sparse row per target set, no N x N matrix
+    similarities = SimilarityCalculator.compute_query_similarity(query_matrix, corpus_matrix)
+    return [summarize_scores(row, TOP_MATCHES) for row in similarities]
+
+
+def rank_matches(snippet_matcher, summary, docs, names):
+    """Top matches of one scored target set, with snippets, as (similarity, match) pairs"""
+    # Only the top matches are materialised, and their snippets scored in one batch
+    top_indices = summary['indices']
+    try:
+        snippets = snippet_matcher.best_snippets([docs[i] for i in top_indices])
+    except Exception as e:
+        print(f"Snippet matching error: {e}")
+        snippets = ["Content analysis unavailable."] * len(top_indices)
+    
+    ranked = []
+    for other_idx, similarity, snippet in zip(top_indices, summary['similarities'], snippets):
+        match_info = names[other_idx]
+        ranked.append((similarity, {
+            'title': match_info.get('title', 'Unknown Document'),
+            'category': match_info.get('category', 'Unknown'),
+            'score': int(SimilarityCalculator.similarity_to_percentage(similarity)),
+            'authors': match_info.get('authors', ''),
+            'url': match_info.get('url', ''),
+            'snippet': snippet
+        }))
+    return ranked
+
+
+def stage_summary(ranked, summary):
+    """Response fields for a subset of the compared documents"""
+    return {
+        'highestMatch': summary['score_max'],
+        'documentsCompared': summary['count'],
+        'matches': [match for _, match in ranked]
+    }
+
+
+def iter_analysis(file, progress=None):
     """
-    Unified Analysis Endpoint
-    - Auto-detects keywords from submitted document
-    - Searches web sources (arXiv, Semantic Scholar, Wikipedia, OpenAlex)
+    Unified Analysis, one stage at a time
     - Compares against local corpus (600+ papers)
+    - Auto-detects keywords and searches web sources (arXiv, Semantic Scholar, Wikipedia, OpenAlex)
     - Runs AI content detection
-    - Returns combined results
+    Yields ('corpus' | 'web' | 'ai', partial results) as stages finish, then ('complete', full response)
     """
-    print("\n" + "!"*50)
-    print("🔥 API REQUEST RECEIVED: /api/analyze")
-    print("!"*50 + "\n")
+    if progress is None:
+        progress = lambda stage, percent: None
     start_time = time.time()
     
-    # Check for uploaded file
-    if 'document' not in request.files:
-        return jsonify({'error': 'No document uploaded'}), 400
-    
-    file = request.files['document']
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
+    # Extract text from uploaded file
+    print(f"📄 Processing file: {file.filename}")
+    progress('extracting', 5)
     try:
-        # Extract text from uploaded file
-        print(f"📄 Processing file: {file.filename}")
         submitted_text = extract_text_from_file(file)
-        
-        extracted_len = len(submitted_text.strip()) if submitted_text else 0
-        print(f"   ✓ Extracted {extracted_len} characters")
+    except DocumentTooLargeError as e:
+        raise AnalysisError(str(e), 413)
+    
+    extracted_len = len(submitted_text.strip()) if submitted_text else 0
+    print(f"   ✓ Extracted {extracted_len} characters")
 
-        if not submitted_text or extracted_len < 10:
-            print("   ❌ Error: Document text is empty or too short.")
-            return jsonify({'error': 'Document is empty or contains no selectable text (scanned PDFs not supported).'}), 400
-        
-        # 1. Load local corpus
-        print("📚 Loading corpus...")
-        corpus_docs, corpus_names, preprocessed_corpus = get_cached_corpus()
+    if not submitted_text or extracted_len < 10:
+        print("   ❌ Error: Document text is empty or too short.")
+        raise AnalysisError('Document is empty or contains no selectable text (scanned PDFs not supported).', 400)
+    
+    # 1. Load local corpus (TF-IDF index is fitted once and kept resident)
+    print("📚 Loading corpus...")
+    progress('loading_corpus', 15)
+    corpus_index = get_corpus_index()
 
-        print(f"   ✓ Loaded {len(corpus_docs)} corpus documents")
-        
-        # 2. Initialize web search and get web documents
-        print("🌐 Searching web sources...")
-        search_manager = WebSearchManager()
-        web_papers = search_manager.search_all(text_content=submitted_text, max_per_source=3)
-        web_docs, web_metadata = search_manager.prepare_for_analysis(web_papers)
-        print(f"   ✓ Found {len(web_docs)} web documents")
-        
-        # 3. Run AI content detection
-        print("🤖 Running AI content analysis...")
-        ai_result = AIContentScanner.analyze(submitted_text)
-        print(f"   ✓ AI Score: {ai_result['score']}% ({ai_result['level']})")
-        
-        # 4. Combine all documents for analysis
-        all_docs = [submitted_text] + corpus_docs + web_docs
-        all_names = [{'title': 'Submitted Document', 'category': 'User Upload'}] + corpus_names
-        
-        # Add web metadata
-        for meta in web_metadata:
-            all_names.append({
-                'title': meta['title'],
-                'category': f"Web - {meta['source']}",
-                'authors': meta.get('authors', ''),
-                'url': meta.get('url', '')
+    if not corpus_index.is_built:
+        raise AnalysisError('Corpus is empty, nothing to compare against.', 500)
+
+    print(f"   ✓ Loaded {len(corpus_index)} corpus documents")
+    
+    # Identical text against the same corpus: reuse the finished analysis
+    cache_key, corpus_version = text_hash(submitted_text), _CORPUS_VERSION
+    if RESULT_CACHE:
+        entry = get_result_cache().get(cache_key, corpus_version)
+        if entry is not None:
+            stages, cached = entry
+            cached['analysisTime'] = f"{round(time.time() - start_time, 1)}s"
+            print(f"⚡ Returning cached analysis ({cached['overallScore']}%)")
+            save_to_history({
+                'fileName': file.filename,
+                'overallScore': cached['overallScore'],
+                'aiScore': cached['aiDetection']['score'],
+                'topMatch': cached['matches'][0]['title'] if cached['matches'] else 'None',
+                'matchesCount': cached['documentsCompared']
             })
-        
-        # 5. Run plagiarism detection
+            # Same events as a fresh run, so streaming clients see every stage
+            for stage, payload in stages:
+                yield stage, payload
+            yield 'complete', cached
+            return
+    
+    # 2. Start web search and AI detection; they run while the corpus is scored
+    print("🌐 Searching web sources...")
+    print("🤖 Running AI content analysis...")
+    executor = None
+    stages = []
+    if CONCURRENT_STAGES:
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='analysis-stage')
+        web_future = executor.submit(search_web, submitted_text)
+        ai_future = executor.submit(run_ai_detection, submitted_text)
+    else:
+        web_future = ImmediateFuture(search_web, submitted_text)
+        ai_future = ImmediateFuture(AIContentScanner.analyze, submitted_text)
+    
+    try:
+        # 3. Score the submission against the corpus
         print("🔍 Running plagiarism analysis...")
-        detector = PlagiarismDetector(max_features=5000)
+        progress('scoring', 25)
+        preprocessed_submission = corpus_index.preprocess([submitted_text])[0]
         
-        # Preprocess submitted and web docs
-        docs_to_preprocess = [submitted_text] + web_docs
-        preprocessed_new = [detector.preprocessor.preprocess(doc) for doc in docs_to_preprocess]
+        fts_paper_ids = search_fts_candidates(submitted_text, FTS_CANDIDATES) if FTS_RETRIEVAL else None
         
-        # Combine all preprocessed docs (submitted, corpus..., web...)
-        all_preprocessed = [preprocessed_new[0]] + preprocessed_corpus + preprocessed_new[1:]
+        # Consistent snapshot of the corpus, in case a sync lands mid-request
+        with corpus_index.lock:
+            corpus_docs, corpus_names = corpus_index.documents, corpus_index.names
+            corpus_matrix = corpus_index.matrix
+            submitted_vector = corpus_index.transform([preprocessed_submission])
+            candidates = corpus_index.candidate_positions(preprocessed_submission, limit=FINGERPRINT_CANDIDATES)
+            source = 'Fingerprint'
+            if not candidates:
+                candidates, source = corpus_index.ann_positions(submitted_vector, limit=ANN_CANDIDATES), 'ANN'
+            if not candidates and fts_paper_ids:
+                candidates, source = corpus_index.positions_by('paper_id', fts_paper_ids), 'Full-text'
+            # The response's corpus statistics still cover every document, not just the shortlist
+            corpus_size = len(corpus_docs)
+            similarity_sum = corpus_index.similarity_sum(submitted_vector) if candidates else None
         
-        detector.add_documents(all_docs, preprocessed_docs=all_preprocessed)
-        results = detector.analyze()
+        if candidates:
+            # Only the shortlist is scored (exactly) against the submission
+            print(f"   ✓ {source} candidates: {len(candidates)} of {len(corpus_docs)}")
+            corpus_docs = [corpus_docs[i] for i in candidates]
+            corpus_names = [corpus_names[i] for i in candidates]
+            corpus_matrix = corpus_matrix[candidates]
         
-        # 6. Calculate results (compare submitted doc against all others)
-        matches = []
-        for result in results['pairwise_results']:
-            # Only get comparisons involving the submitted document (index 0)
-            if result['doc1_index'] == 0:
-                other_idx = result['doc2_index']
-                if other_idx < len(all_names):
-                    match_info = all_names[other_idx]
-                    match_doc_content = all_docs[other_idx]
-                    
-                    # Get snippet
-                    snippet = get_best_matching_snippet(submitted_text, match_doc_content)
-                    
-                    matches.append({
-                        'title': match_info.get('title', 'Unknown Document'),
-                        'category': match_info.get('category', 'Unknown'),
-                        'score': int(result['similarity_percentage']),
-                        'authors': match_info.get('authors', ''),
-                        'url': match_info.get('url', ''),
-                        'snippet': snippet
-                    })
+        # Shards only pay off on the full corpus, not on a candidate shortlist
+        snippet_matcher = SnippetMatcher(submitted_text)
+        corpus_summary = score_corpus(corpus_matrix, submitted_vector, sharded=SHARDED_SEARCH and not candidates)[0]
+        if candidates:
+            # Averaged over the whole corpus, from the unrounded similarities
+            corpus_summary = dict(corpus_summary, count=corpus_size,
+                                  score_sum=SimilarityCalculator.similarity_to_percentage(similarity_sum))
+        corpus_ranked = rank_matches(snippet_matcher, corpus_summary, corpus_docs, corpus_names)
+        stages.append(('corpus', stage_summary(corpus_ranked, corpus_summary)))
+        yield stages[-1]
         
-        # Sort by score descending
-        matches.sort(key=lambda x: x['score'], reverse=True)
-        top_matches = matches[:10]  # Top 10 matches
+        # 4. Web and AI results, in whichever order they finish
+        progress('web_search', 40)
+        pending = {web_future: 'web', ai_future: 'ai'}
+        finished = as_completed(pending) if executor else list(pending)
+        for future in finished:
+            if pending[future] == 'web':
+                web_docs, web_names = future.result()
+                print(f"   ✓ Found {len(web_docs)} web documents")
+                
+                web_similarities = np.zeros(0)
+                if web_docs:
+                    web_matrix = corpus_index.transform(corpus_index.preprocess(web_docs))
+                    web_similarities = SimilarityCalculator.compute_query_similarity(submitted_vector, web_matrix)[0]
+                web_summary = summarize_scores(web_similarities, TOP_MATCHES)
+                web_ranked = rank_matches(snippet_matcher, web_summary, web_docs, web_names)
+                progress('web_search', 75)
+                stages.append(('web', stage_summary(web_ranked, web_summary)))
+                yield stages[-1]
+            else:
+                ai_result = future.result()
+                print(f"   ✓ AI Score: {ai_result['score']}% ({ai_result.get('level')})")
+                stages.append(('ai', {'aiDetection': ai_result}))
+                yield stages[-1]
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    # 4. Combine corpus and web results (stable sort keeps corpus first on ties)
+    progress('merging', 95)
+    ranked = sorted(corpus_ranked + web_ranked, key=lambda pair: -pair[0])[:TOP_MATCHES]
+    top_matches = [match for _, match in ranked]
+    
+    # Calculate statistics
+    documents_compared = corpus_summary['count'] + web_summary['count']
+    highest_match = max(corpus_summary['score_max'], web_summary['score_max'])
+    score_total = corpus_summary['score_sum'] + web_summary['score_sum']
+    avg_similarity = round(score_total / documents_compared, 1) if documents_compared else 0
+    
+    # Overall score is the highest match found
+    overall_score = highest_match
+    
+    # Calculate analysis time
+    analysis_time = f"{round(time.time() - start_time, 1)}s"
+    
+    print(f"✅ Analysis complete in {analysis_time}")
+    print(f"   ✓ Overall Score: {overall_score}%")
+    print(f"   ✓ Top Match: {top_matches[0]['title'] if top_matches else 'None'}")
+    
+    # 5. Build response
+    response_data = {
+        'overallScore': overall_score,
+        'highestMatch': highest_match,
+        'avgSimilarity': avg_similarity,
+        'documentsCompared': documents_compared,
+        'analysisTime': analysis_time,
+        'matches': top_matches,
+        'aiDetection': ai_result
+    }
+    
+    # Save to history
+    save_to_history({
+        'fileName': file.filename,
+        'overallScore': overall_score,
+        'aiScore': ai_result['score'],
+        'topMatch': top_matches[0]['title'] if top_matches else 'None',
+        'matchesCount': documents_compared
+    })
+    
+    if RESULT_CACHE:
+        get_result_cache().put(cache_key, corpus_version, (stages, response_data))
+    
+    yield 'complete', response_data
+
+
+def analyze_upload(file, progress=None):
+    """Run every analysis stage and return the combined response"""
+    for stage, payload in iter_analysis(file, progress):
+        if stage == 'complete':
+            return payload
+
+
+def get_uploaded_document():
+    """The 'document' upload of the current request, or an (error response, status) tuple"""
+    if 'document' not in request.files:
+        return None, (jsonify({'error': 'No document uploaded'}), 400)
+    
+    file = request.files['document']
+    if file.filename == '':
+        return None, (jsonify({'error': 'No file selected'}), 400)
+    
+    return file, None
+
+
+def detach_upload(file):
+    """In-memory copy of an upload (size-checked first), usable after the request stream is closed"""
+    data = open_bounded(file.stream, MAX_UPLOAD_BYTES).read()
+    return FileStorage(stream=io.BytesIO(data), filename=file.filename, content_type=file.content_type)
+
+
+@app.errorhandler(DocumentTooLargeError)
+def document_too_large(e):
+    return jsonify({'error': str(e)}), 413
+
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze_document():
+    """Unified Analysis Endpoint (synchronous; see POST /api/jobs for the queued variant)"""
+    print("\n" + "!"*50)
+    print("🔥 API REQUEST RECEIVED: /api/analyze")
+    print("!"*50 + "\n")
+    
+    file, error = get_uploaded_document()
+    if error:
+        return error
+    
+    try:
+        return jsonify(analyze_upload(file))
+    
+    except AnalysisError as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    except Exception as e:
+        print(f"❌ Analysis error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_document_stream():
+    """
+    Streaming Analysis Endpoint (Server-Sent Events)
+    Emits 'corpus', 'web' and 'ai' events as each stage finishes, then
+    'complete' with the same payload as /api/analyze ('error' on failure)
+    """
+    print("\n" + "!"*50)
+    print("🔥 API REQUEST RECEIVED: /api/analyze/stream")
+    print("!"*50 + "\n")
+    
+    file, error = get_uploaded_document()
+    if error:
+        return error
+    
+    upload = detach_upload(file)
+    
+    def generate():
+        try:
+            for stage, payload in iter_analysis(upload):
+                yield sse_event(stage, payload)
+        except AnalysisError as e:
+            yield sse_event('error', {'error': str(e), 'status': e.status})
+        except Exception as e:
+            print(f"❌ Analysis error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            yield sse_event('error', {'error': str(e), 'status': 500})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Batch Analysis Endpoint (local corpus only, no web search or AI detection)
+    - Accepts many uploads as 'documents'
+    - Scores all of them against the corpus index in one sparse multiply
+    - Reports similarity between the submissions themselves
+    """
+    print("\n" + "!"*50)
+    print("🔥 API REQUEST RECEIVED: /api/analyze/batch")
+    print("!"*50 + "\n")
+    start_time = time.time()
+    
+    files = [file for file in request.files.getlist('documents') if file.filename]
+    if not files:
+        return jsonify({'error': 'No documents uploaded'}), 400
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({'error': f'Too many documents (max {MAX_BATCH_FILES})'}), 400
+    
+    try:
+        corpus_index = get_corpus_index()
+        if not corpus_index.is_built:
+            return jsonify({'error': 'Corpus is empty, nothing to compare against.'}), 500
         
-        # Calculate statistics
-        all_scores = [m['score'] for m in matches]
-        highest_match = max(all_scores) if all_scores else 0
-        avg_similarity = round(sum(all_scores) / len(all_scores), 1) if all_scores else 0
+        # Extract everything first; unreadable files are reported, not fatal
+        results = []
+        texts = []
+        positions = []
+        for file in files:
+            try:
+                text = extract_text_from_file(file)
+            except Exception as e:
+                results.append({'fileName': file.filename, 'error': str(e)})
+                continue
+            if not text or len(text.strip()) < 10:
+                results.append({'fileName': file.filename, 'error': 'Document is empty or contains no selectable text.'})
+                continue
+            positions.append(len(results))
+            results.append(None)
+            texts.append(text)
+        print(f"📄 Extracted {len(texts)} of {len(files)} documents")
         
-        # Overall score is the highest match found
-        overall_score = highest_match
+        cross_matches = []
+        if texts:
+            print("🔍 Running batch plagiarism analysis...")
+            preprocessed = preprocess_many(texts, workers=PREPROCESS_WORKERS, preprocessor=corpus_index.preprocessor)
+            
+            with corpus_index.lock:
+                corpus_docs, corpus_names = corpus_index.documents, corpus_index.names
+                corpus_matrix = corpus_index.matrix
+                batch_matrix = corpus_index.transform(preprocessed)
+            
+            # One (batch x corpus) product for all submissions, one (batch x batch) for cross-checks
+            summaries = score_corpus(corpus_matrix, batch_matrix, sharded=SHARDED_SEARCH)
+            
+            for position, text, summary in zip(positions, texts, summaries):
+                ranked = rank_matches(SnippetMatcher(text), summary, corpus_docs, corpus_names)
+                results[position] = {
+                    'fileName': files[position].filename,
+                    'overallScore': summary['score_max'],
+                    'highestMatch': summary['score_max'],
+                    'avgSimilarity': round(summary['score_sum'] / summary['count'], 1) if summary['count'] else 0,
+                    'documentsCompared': summary['count'],
+                    'matches': [match for _, match in ranked]
+                }
+            
+            for pair in PlagiarismDetector.cross_pairs(batch_matrix, BATCH_CROSS_THRESHOLD):
+                cross_matches.append({
+                    'fileA': files[positions[pair['doc1_index']]].filename,
+                    'fileB': files[positions[pair['doc2_index']]].filename,
+                    'score': int(pair['similarity_percentage'])
+                })
         
-        # Calculate analysis time
         analysis_time = f"{round(time.time() - start_time, 1)}s"
+        print(f"✅ Batch analysis of {len(texts)} documents complete in {analysis_time}")
         
-        print(f"✅ Analysis complete in {analysis_time}")
-        print(f"   ✓ Overall Score: {overall_score}%")
-        print(f"   ✓ Top Match: {top_matches[0]['title'] if top_matches else 'None'}")
-        
-        # 7. Build response
-        response_data = {
-            'overallScore': overall_score,
-            'highestMatch': highest_match,
-            'avgSimilarity': avg_similarity,
-            'documentsCompared': len(all_docs) - 1,  # Exclude submitted doc
-            'analysisTime': analysis_time,
-            'matches': top_matches,
-            'aiDetection': ai_result
-        }
-        
-        # Save to history
-        save_to_history({
-            'fileName': file.filename,
-            'overallScore': overall_score,
-            'aiScore': ai_result['score'],
-            'topMatch': top_matches[0]['title'] if top_matches else 'None',
-            'matchesCount': len(matches)
+        return jsonify({
+            'results': results,
+            'crossMatches': cross_matches,
+            'documentsCompared': len(corpus_index),
+            'analysisTime': analysis_time
         })
-        
-        return jsonify(response_data)
     
     except Exception as e:
-        print(f"❌ Analysis error: {str(e)}")
+        print(f"❌ Batch analysis error: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 
-def get_best_matching_snippet(source_text, target_text):
-    """Find the sentence in target_text that best matches any part of source_text"""
+_JOB_MANAGER = None
+_JOB_MANAGER_LOCK = threading.Lock()
+
+def get_job_manager():
+    """Process-wide job queue (created once; a second manager would lose the first one's jobs)"""
+    global _JOB_MANAGER
+    with _JOB_MANAGER_LOCK:
+        if _JOB_MANAGER is None:
+            _JOB_MANAGER = JobManager(workers=JOB_WORKERS)
+        return _JOB_MANAGER
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_analysis_job():
+    """Queue an analysis and return its job id immediately (poll GET /api/jobs/<id>)"""
+    file, error = get_uploaded_document()
+    if error:
+        return error
+    
     try:
-        # Basic caching/optimization could go here, but for now direct comparison
-        source_sents = sent_tokenize(source_text)[:50] # Check first 50 sentences to save time
-        target_sents = sent_tokenize(target_text)
-        
-        best_match = "No specific text match found."
-        max_overlap = 0
-        
-        # Pre-process source sentences into sets of words
+        # The upload stream is gone once the request ends, so the job gets its own copy
+        job_id = get_job_manager().submit(analyze_upload, detach_upload(file))
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    print(f"📥 Queued analysis job {job_id} for {file.filename}")
+    return jsonify({'jobId': job_id, 'status': 'queued', 'statusUrl': f"/api/jobs/{job_id}"}), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Status, stage and progress of a queued analysis, with the result once done"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job)
+
+
+class SnippetMatcher:
+    """
+    Finds, for each target document, the sentence that best overlaps any
+    submission sentence. The submission is sentence-tokenized once; target
+    sentences are scored with a sparse binary term matrix product instead of
+    pairwise set intersections.
+    """
+    
+    def __init__(self, source_text):
+        source_sents = sent_tokenize(source_text)[:50]  # Check first 50 sentences to save time
         source_sets = [set(s.lower().split()) for s in source_sents if len(s.split()) > 5]
         
-        for t_sent in target_sents:
-            words = t_sent.lower().split()
-            if len(words) < 5: continue 
-            t_set = set(words)
-            
-            for s_set in source_sets:
-                # Jaccard-ish similarity (intersection / smaller_set_len)
-                intersection = len(s_set.intersection(t_set))
-                if intersection > 0:
-                    score = intersection / min(len(s_set), len(t_set))
-                    if score > max_overlap:
-                        max_overlap = score
-                        best_match = t_sent
+        self.vocabulary = {}
+        rows, cols = [], []
+        for row, words in enumerate(source_sets):
+            for word in words:
+                rows.append(row)
+                cols.append(self.vocabulary.setdefault(word, len(self.vocabulary)))
+        self.source_matrix = sp.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(len(source_sets), len(self.vocabulary))
+        )
+        self.source_lengths = np.array([len(words) for words in source_sets], dtype=float)
+    
+    def _target_matrix(self, target_sents):
+        # Only words shared with the submission matter for the intersection; set sizes are kept separately
+        rows, cols, lengths = [], [], []
+        for row, sent in enumerate(target_sents):
+            words = set(sent.lower().split())
+            lengths.append(len(words))
+            for word in words:
+                col = self.vocabulary.get(word)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        matrix = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(target_sents), len(self.vocabulary)))
+        return matrix, np.array(lengths, dtype=float)
+    
+    def best_snippets(self, target_texts):
+        """Return one snippet per target text"""
+        doc_sents = []
+        for text in target_texts:
+            try:
+                doc_sents.append([s for s in sent_tokenize(text) if len(s.lower().split()) >= 5])
+            except Exception:
+                doc_sents.append(None)
         
-        if max_overlap > 0.3: # Threshold
-            return "..." + best_match + "..."
-        elif max_overlap > 0:
-             return "..." + best_match + "..."
-        return "Similar concepts or formatting detected."
+        all_sents = [s for sents in doc_sents if sents for s in sents]
+        if all_sents and len(self.source_lengths):
+            target_matrix, target_lengths = self._target_matrix(all_sents)
+            # Overlap = |S ∩ T| / min(|S|, |T|) for every target x source sentence pair
+            intersections = (target_matrix @ self.source_matrix.T).toarray()
+            scores = intersections / np.minimum(target_lengths[:, None], self.source_lengths[None, :])
+        else:
+            scores = np.zeros((len(all_sents), 0))
+        
+        snippets = []
+        offset = 0
+        for sents in doc_sents:
+            if sents is None:
+                snippets.append("Content analysis unavailable.")
+                continue
+            block = scores[offset:offset + len(sents)]
+            offset += len(sents)
+            if block.size == 0 or block.max() <= 0:
+                snippets.append("Similar concepts or formatting detected.")
+                continue
+            # argmax returns the first maximum in target-then-source order, like the original scan
+            best_row = np.unravel_index(np.argmax(block), block.shape)[0]
+            snippets.append("..." + sents[best_row] + "...")
+        return snippets
+
+
+def get_best_matching_snippet(source_text, target_text):
+    """Find the sentence in target_text that best matches any part of source_text"""
+    try:
+        return SnippetMatcher(source_text).best_snippets([target_text])[0]
     except:
         return "Content analysis unavailable."
 
 
+@app.route('/api/corpus/sync', methods=['POST'])
+def corpus_sync():
+    """Pick up added, changed and deleted corpus files without restarting"""
+    try:
+        return jsonify(sync_corpus())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    corpus_docs, _, _ = get_cached_corpus()
+    # The index (memory-mapped when saved) is the live corpus, synced with files and stored rows
     return jsonify({
         'status': 'healthy',
-        'corpus_size': len(corpus_docs),
+        'corpus_size': len(get_corpus_index()),
+        'web_cache': get_search_cache().get_stats(),
+        'web_ingest': _WEB_INGESTOR.stats if _WEB_INGESTOR else None,
+        'jobs': _JOB_MANAGER.get_stats() if _JOB_MANAGER else None,
+        'result_cache': _RESULT_CACHE.get_stats() if _RESULT_CACHE else None,
         'version': '2.0.0-unified'
     })
 
@@ -388,13 +1195,20 @@ if __name__ == '__main__':
     print("\n📥 Downloading NLTK resources...")
     download_nltk_resources()
     
-    # Check corpus
-    corpus_docs, _, _ = get_cached_corpus()
-    print(f"\n📚 Loaded {len(corpus_docs)} documents from corpus")
+    # Check corpus and fit the TF-IDF index up front
+    corpus_index = get_corpus_index()
+    print(f"\n📚 Loaded {len(corpus_index)} documents from corpus")
+    
+    if CORPUS_WATCH_INTERVAL:
+        start_corpus_watcher(CORPUS_WATCH_INTERVAL)
+        print(f"   👀 Watching corpus for changes every {CORPUS_WATCH_INTERVAL}s")
     
     print("\n✅ Server ready!")
     print("   👉 Open App: http://localhost:5000")
     print("   📊 API Endpoint: POST /api/analyze")
+    print("   📦 Batch Analysis: POST /api/analyze/batch")
+    print("   📡 Streaming Analysis: POST /api/analyze/stream")
+    print("   ⏳ Queued Analysis: POST /api/jobs, GET /api/jobs/<id>")
     print("   🏥 Health Check: GET /api/health")
     print("="*60 + "\n")
     
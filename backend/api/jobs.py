@@ -0,0 +1,105 @@
+"""
+Background Analysis Jobs for PLAUGE
+Runs expensive analyses off the request thread:
+- Bounded worker pool (caps concurrent extraction / scoring / web search)
+- Bounded queue; submissions beyond it are rejected instead of piling up
+- Per-job status, stage and progress for polling, finished jobs expire after a TTL
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+JOB_WORKERS = 2
+MAX_PENDING_JOBS = 32
+
+# Finished jobs are kept for polling this long, and at most this many are kept
+JOB_TTL = 3600
+MAX_STORED_JOBS = 500
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class JobManager:
+    """Queue of analysis jobs executed by a fixed-size thread pool"""
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=MAX_PENDING_JOBS, ttl=JOB_TTL, max_stored=MAX_STORED_JOBS):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.max_stored = max_stored
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis-job')
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, progress=callback, **kwargs); returns the job id"""
+        with self.lock:
+            self._prune()
+            pending = sum(1 for job in self.jobs.values() if job['status'] in ('queued', 'running'))
+            if pending >= self.max_pending:
+                raise QueueFullError(f"Too many queued analyses ({pending}), try again later")
+
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self.jobs[job_id] = {
+                'jobId': job_id,
+                'status': 'queued',
+                'stage': 'queued',
+                'progress': 0,
+                'result': None,
+                'error': None,
+                'errorStatus': None,
+                'createdAt': now,
+                'updatedAt': now
+            }
+
+        self.executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        """Snapshot of a job, or None if unknown / expired"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                job['updatedAt'] = time.time()
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status='running', stage='starting')
+
+        def progress(stage, percent):
+            self._update(job_id, stage=stage, progress=percent)
+
+        try:
+            result = func(*args, progress=progress, **kwargs)
+            self._update(job_id, status='done', stage='done', progress=100, result=result)
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            self._update(job_id, status='failed', error=str(e), errorStatus=getattr(e, 'status', 500))
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished:
+            if self.jobs[job_id]['updatedAt'] < cutoff or len(self.jobs) > self.max_stored:
+                del self.jobs[job_id]
+
+    def get_stats(self):
+        with self.lock:
+            stats = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+            for job in self.jobs.values():
+                stats[job['status']] += 1
+        return stats
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,84 @@
+"""
+Analysis Result Cache for PLAUGE
+Remembers finished /api/analyze responses (with their stage events) by a
+hash of the extracted text, so duplicate submissions skip preprocessing,
+web search, AI scanning and scoring:
+- Entries are tagged with the corpus version they were computed against and
+  never served for another one; a version bump drops them all
+- Bounded LRU with a TTL (web results folded into a response age too)
+- Hit / miss counters for monitoring
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+MAX_RESULT_ENTRIES = 256
+RESULT_TTL = 3600
+
+
+def text_hash(text):
+    """Hash of the extracted submission text"""
+    return hashlib.sha256(text.encode('utf-8', errors='ignore')).hexdigest()
+
+
+class AnalysisResultCache:
+    """In-memory LRU of analysis results keyed by (text hash, corpus version)"""
+
+    def __init__(self, max_entries=MAX_RESULT_ENTRIES, ttl=RESULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key, version):
+        """A copy of the cached entry, or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key) if version == self.version else None
+            if entry is not None:
+                expires, response = entry
+                if expires > now:
+                    self.entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return copy.deepcopy(response)
+                del self.entries[key]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, version, response):
+        with self.lock:
+            if version != self.version:
+                # Computed against an older corpus than the cache has seen: not worth keeping
+                if self.version is not None and version < self.version:
+                    return
+                self._reset(version)
+            self.entries[key] = (time.time() + self.ttl, copy.deepcopy(response))
+            self.entries.move_to_end(key)
+            self.stats['stores'] += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, version):
+        """Drop every entry; only responses for `version` are stored from now on"""
+        with self.lock:
+            self._reset(version)
+
+    def _reset(self, version):
+        if self.entries:
+            self.stats['invalidations'] += 1
+        self.entries.clear()
+        self.version = version
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats, entries=len(self.entries), version=self.version)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
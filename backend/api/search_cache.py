@@ -0,0 +1,139 @@
+"""
+Web Search Result Cache for PLAUGE
+Caches each source's results per normalized query so repeat or similar
+submissions skip the external APIs:
+- In-memory LRU tier with TTL and a max entry count
+- Optional SQLite tier that survives restarts and is shared by workers
+- Hit / miss counters for monitoring
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+SEARCH_CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'search_cache.db')
+
+# Defaults: one day freshness, bounded memory and disk footprint
+DEFAULT_TTL = 24 * 3600
+MAX_MEMORY_ENTRIES = 512
+MAX_DB_ENTRIES = 20000
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a query"""
+    return re.sub(r'\s+', ' ', str(query)).strip().lower()
+
+
+class SearchResultCache:
+    """Two-tier (memory LRU + optional SQLite) TTL cache of web search results"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=MAX_MEMORY_ENTRIES, db_file=None, max_db_entries=MAX_DB_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_db_entries = max_db_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+        self.conn = None
+        if db_file:
+            self.conn = sqlite3.connect(db_file, check_same_thread=False)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    results TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    expires REAL NOT NULL
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_search_cache_created ON search_cache(created)')
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(source, query, max_results):
+        return f"{source}|{max_results}|{normalize_query(query)}"
+
+    def get(self, source, query, max_results):
+        """Cached results, or None on a miss / expired entry"""
+        key = self.make_key(source, query, max_results)
+        now = time.time()
+
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                expires, results = entry
+                if expires > now:
+                    self.memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return results
+                del self.memory[key]
+
+            if self.conn is not None:
+                row = self.conn.execute(
+                    'SELECT results, expires FROM search_cache WHERE cache_key = ?', (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    results = json.loads(row[0])
+                    self._remember(key, row[1], results)
+                    self.stats['db_hits'] += 1
+                    return results
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, source, query, max_results, results):
+        key = self.make_key(source, query, max_results)
+        now = time.time()
+        expires = now + self.ttl
+
+        with self.lock:
+            self._remember(key, expires, results)
+            self.stats['stores'] += 1
+
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        'INSERT OR REPLACE INTO search_cache (cache_key, results, created, expires) VALUES (?, ?, ?, ?)',
+                        (key, json.dumps(results), now, expires)
+                    )
+                    self._evict_db(now)
+
+    def _remember(self, key, expires, results):
+        self.memory[key] = (expires, results)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _evict_db(self, now):
+        self.conn.execute('DELETE FROM search_cache WHERE expires <= ?', (now,))
+        self.conn.execute('''
+            DELETE FROM search_cache WHERE cache_key IN (
+                SELECT cache_key FROM search_cache ORDER BY created DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_db_entries,))
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self.memory)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute('DELETE FROM search_cache')
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
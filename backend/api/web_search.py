@@ -6,15 +6,39 @@ Features:
 - Basic AI content detection patterns
 """
 
-import requests
 import json
 import time
 import re
 import wikipedia
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import List, Dict, Tuple
 from rake_nltk import Rake
 
+from backend.utils import http_client
+from backend.api.search_cache import SearchResultCache, SEARCH_CACHE_FILE
+
+
+# Overall time budget (seconds) for a concurrent search_all; slower sources are dropped
+SEARCH_DEADLINE = 12.0
+
+# SQLite tier for the search result cache (None keeps it in memory only)
+SEARCH_CACHE_DB = SEARCH_CACHE_FILE
+
+_SEARCH_CACHE = None
+
+
+def get_search_cache() -> SearchResultCache:
+    """Process-wide search result cache, created on first use"""
+    global _SEARCH_CACHE
+    if _SEARCH_CACHE is None:
+        try:
+            _SEARCH_CACHE = SearchResultCache(db_file=SEARCH_CACHE_DB)
+        except Exception as e:
+            print(f"Warning: Search cache database unavailable ({e}), using memory only")
+            _SEARCH_CACHE = SearchResultCache()
+    return _SEARCH_CACHE
+
 
 class KeywordExtractor:
     """Extract search keywords from text"""
@@ -57,27 +81,34 @@ class WikipediaSearcher:
     """Search Wikipedia"""
     
     @staticmethod
-    def search(query: str, max_results: int = 3) -> List[Dict]:
+    def fetch_page(title: str) -> Dict:
+        try:
+            page = wikipedia.page(title, auto_suggest=False)
+            return {
+                'title': page.title,
+                'authors': 'Wikipedia Contributors',
+                'abstract': page.summary[:500] + "...",
+                'published': 'N/A',
+                'source': 'Wikipedia',
+                'id': page.pageid,
+                'url': page.url
+            }
+        except (wikipedia.DisambiguationError, wikipedia.PageError):
+            return None
+    
+    @staticmethod
+    def search(query: str, max_results: int = 3, parallel: bool = True) -> List[Dict]:
         try:
             results = wikipedia.search(query, results=max_results)
-            papers = []
             
-            for title in results:
-                try:
-                    page = wikipedia.page(title, auto_suggest=False)
-                    papers.append({
-                        'title': page.title,
-                        'authors': 'Wikipedia Contributors',
-                        'abstract': page.summary[:500] + "...",
-                        'published': 'N/A',
-                        'source': 'Wikipedia',
-                        'id': page.pageid,
-                        'url': page.url
-                    })
-                except (wikipedia.DisambiguationError, wikipedia.PageError):
-                    continue
+            if parallel and len(results) > 1:
+                # Fetch pages concurrently, keeping search-result order
+                with ThreadPoolExecutor(max_workers=len(results)) as pool:
+                    pages = list(pool.map(WikipediaSearcher.fetch_page, results))
+            else:
+                pages = [WikipediaSearcher.fetch_page(title) for title in results]
                     
-            return papers
+            return [page for page in pages if page is not None]
         except Exception as e:
             print(f"Wikipedia search error: {e}")
             return []
@@ -96,7 +127,7 @@ class ArxivSearcher:
             'sortOrder': 'descending'
         }
         try:
-            response = requests.get(ArxivSearcher.BASE_URL, params=params, timeout=10)
+            response = http_client.get(ArxivSearcher.BASE_URL, params=params, timeout=10)
             if response.status_code != 200: return []
             
             import xml.etree.ElementTree as ET
@@ -133,7 +164,7 @@ class SemanticScholarSearcher:
     def search(query: str, max_results: int = 5) -> List[Dict]:
         params = {'query': query, 'limit': max_results, 'fields': 'title,authors,abstract,year,url'}
         try:
-            response = requests.get(SemanticScholarSearcher.BASE_URL, params=params, timeout=10)
+            response = http_client.get(SemanticScholarSearcher.BASE_URL, params=params, timeout=10)
             if response.status_code != 200: return []
             
             data = response.json()
@@ -286,7 +317,7 @@ class OpenAlexSearcher:
             'select': 'title,authorships,abstract_inverted_index,publication_year,id,doi'
         }
         try:
-            response = requests.get(OpenAlexSearcher.BASE_URL, params=params, timeout=10)
+            response = http_client.get(OpenAlexSearcher.BASE_URL, params=params, timeout=10)
             if response.status_code != 200: return []
             
             data = response.json()
@@ -306,6 +337,7 @@ class OpenAlexSearcher:
                     'title': work.get('title', 'Unknown'),
                     'authors': ', '.join(authors[:3]),
                     'abstract': work.get('title', '') + " - " + ', '.join(authors), # Fallback text
+                    'abstract_is_fallback': True,
                     'published': str(work.get('publication_year', 'N/A')),
                     'source': 'OpenAlex',
                     'id': work.get('id', ''),
@@ -320,15 +352,37 @@ class OpenAlexSearcher:
 class WebSearchManager:
     """Unified Search Manager"""
     
-    def __init__(self):
+    def __init__(self, cache=None, use_cache: bool = True):
         self.extractor = KeywordExtractor()
+        # Results are cached per source and normalized query (shared across requests by default)
+        self.cache = (cache or get_search_cache()) if use_cache else None
     
     def generate_query(self, text: str) -> str:
         return self.extractor.extract(text)
     
-    def search_all(self, query: str = None, text_content: str = None, max_per_source: int = 3) -> List[Dict]:
+    @staticmethod
+    def _sources(max_per_source: int) -> List[Tuple]:
+        return [
+            ('Wikipedia', WikipediaSearcher.search, 2),  # General
+            ('arXiv', ArxivSearcher.search, max_per_source),  # Preprints
+            ('Semantic Scholar', SemanticScholarSearcher.search, max_per_source),  # Academic
+            ('OpenAlex', OpenAlexSearcher.search, max_per_source),  # Global Research
+        ]
+    
+    def _cached(self, name: str, query: str, limit: int):
+        return self.cache.get(name, query, limit) if self.cache is not None else None
+    
+    def _store(self, name: str, query: str, limit: int, papers: List[Dict]):
+        # Empty lists are usually API errors, so they are not cached
+        if self.cache is not None and papers:
+            self.cache.put(name, query, limit, papers)
+    
+    def search_all(self, query: str = None, text_content: str = None, max_per_source: int = 3,
+                   concurrent: bool = True, deadline: float = SEARCH_DEADLINE) -> List[Dict]:
         """
-        Search using query OR extract query from text
+        Search using query OR extract query from text.
+        With concurrent=True all sources are queried in parallel and whatever
+        has arrived when the deadline fires is returned.
         """
         if not query and text_content:
             print("🤖 Auto-generating search keywords from document...")
@@ -337,26 +391,49 @@ class WebSearchManager:
             
         if not query:
             return []
+        
+        if concurrent:
+            return self._search_concurrent(query, max_per_source, deadline)
             
         all_papers = []
+        for name, search, limit in self._sources(max_per_source):
+            papers = self._cached(name, query, limit)
+            if papers is None:
+                print(f"🔍 Searching {name}...")
+                papers = search(query, max_results=limit)
+                self._store(name, query, limit, papers)
+            else:
+                print(f"💾 {name}: {len(papers)} cached results")
+            all_papers.extend(papers)
         
-        # 1. Wikipedia (General)
-        print(f"🔍 Searching Wikipedia...")
-        all_papers.extend(WikipediaSearcher.search(query, max_results=2))
-        
-        # 2. arXiv (Preprints)
-        print(f"🔍 Searching arXiv...")
-        all_papers.extend(ArxivSearcher.search(query, max_results=max_per_source))
+        return all_papers
+    
+    def _search_concurrent(self, query: str, max_per_source: int, deadline: float) -> List[Dict]:
+        sources = self._sources(max_per_source)
+        results = [self._cached(name, query, limit) for name, _, limit in sources]
+        pending = [i for i, papers in enumerate(results) if papers is None]
         
-        # 3. Semantic Scholar (Academic)
-        print(f"🔍 Searching Semantic Scholar...")
-        all_papers.extend(SemanticScholarSearcher.search(query, max_results=max_per_source))
+        if len(pending) < len(sources):
+            print(f"💾 {len(sources) - len(pending)} of {len(sources)} sources served from cache")
         
-        # 4. OpenAlex (Global Research)
-        print(f"🔍 Searching OpenAlex...")
-        all_papers.extend(OpenAlexSearcher.search(query, max_results=max_per_source))
+        if pending:
+            print(f"🔍 Searching {', '.join(sources[i][0] for i in pending)} in parallel...")
+            pool = ThreadPoolExecutor(max_workers=len(pending))
+            futures = {i: pool.submit(sources[i][1], query, max_results=sources[i][2]) for i in pending}
+            done, not_done = wait(futures.values(), timeout=deadline)
+            # Don't block on stragglers; their results are simply discarded
+            pool.shutdown(wait=False, cancel_futures=True)
+            
+            for i, future in futures.items():
+                name, _, limit = sources[i]
+                if future in done and future.exception() is None:
+                    results[i] = future.result()
+                    self._store(name, query, limit, results[i])
+                elif future in not_done:
+                    print(f"⏱️  {name} missed the {deadline}s deadline, skipping")
         
-        return all_papers
+        # Same source order as the sequential path
+        return [paper for papers in results if papers for paper in papers]
 
     @staticmethod
     def prepare_for_analysis(papers: List[Dict]) -> tuple:
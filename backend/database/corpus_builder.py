@@ -21,17 +21,21 @@ Usage:
     python corpus_builder.py --export              # Export to txt files
 """
 
-import urllib.request
-import urllib.parse
-import json
 import xml.etree.ElementTree as ET
 import sqlite3
 import os
 import time
 import sys
 import hashlib
+import re
+from collections import Counter
 from datetime import datetime
-import ssl
+from urllib.parse import quote
+
+# Allow running this file directly as well as through main.py
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backend.utils import http_client
 
 
 # ============================================================================
@@ -47,6 +51,32 @@ SEMANTIC_SCHOLAR_API = "https://api.semanticscholar.org/graph/v1/paper/search"
 CROSSREF_API = "https://api.crossref.org/works"
 OPENALEX_API = "https://api.openalex.org/works"
 
+# Timeout (seconds) for each API request
+FETCH_TIMEOUT = 30
+
+# Papers looked up / inserted per executemany chunk inside one add_papers transaction
+BULK_INSERT_BATCH = 5000
+# Max number of SQLite host parameters used in one IN (...) lookup
+LOOKUP_BATCH_SIZE = 500
+# Rows fetched per round trip by CorpusDatabase.iter_papers
+PAPER_BATCH_SIZE = 5000
+
+# Full-text search: title hits weigh more than abstract hits in the BM25 ranking
+FTS_TITLE_WEIGHT = 10.0
+FTS_ABSTRACT_WEIGHT = 1.0
+# Distinct terms of a document used as an FTS candidate query (most frequent first)
+FTS_QUERY_TERMS = 32
+
+# Marks papers stored by the web search stage (papers.topics); they are not part of the
+# built corpus, so exports and statistics leave them out
+WEB_TOPIC = 'web_search'
+CORPUS_PAPERS_SQL = '(topics IS NULL OR topics != ?)'
+
+# Per-row results of CorpusDatabase.add_papers
+PAPER_INSERTED = 'inserted'
+PAPER_DUPLICATE = 'duplicate'
+PAPER_INVALID = 'invalid'
+
 # Rate limiting (seconds between requests)
 RATE_LIMITS = {
     'arxiv': 3.0,
@@ -63,15 +93,30 @@ RATE_LIMITS = {
 class CorpusDatabase:
     """SQLite database for managing the corpus."""
     
-    def __init__(self, db_file=DATABASE_FILE):
+    def __init__(self, db_file=DATABASE_FILE, read_only=False):
         self.db_file = db_file
+        self.read_only = read_only
         self.conn = None
         self._connect()
-        self._create_tables()
+        if read_only:
+            # Query-only connection (shareable across threads): no schema setup
+            self.has_fts = self._table_exists('papers_fts')
+        else:
+            self._create_tables()
     
     def _connect(self):
-        self.conn = sqlite3.connect(self.db_file)
+        if self.read_only:
+            uri = f"file:{quote(os.path.abspath(self.db_file))}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(self.db_file, timeout=30)
         self.conn.row_factory = sqlite3.Row
+        if not self.read_only:
+            # WAL lets readers (the API) continue while a download writes; NORMAL sync is safe with WAL
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.conn.execute('PRAGMA cache_size=-65536')
     
     def _create_tables(self):
         cursor = self.conn.cursor()
@@ -116,8 +161,50 @@ class CorpusDatabase:
         ''')
         
         self.conn.commit()
+        self.has_fts = self._create_fts()
+    
+    def _create_fts(self):
+        """
+        FTS5 index over papers (title, abstract), kept in sync by triggers.
+        Databases created before it existed are indexed once here. Returns
+        False if this SQLite build has no FTS5 (search falls back to LIKE).
+        """
+        exists = self._table_exists('papers_fts')
+        try:
+            with self.conn:
+                self.conn.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                        title, abstract, content='papers', content_rowid='id', tokenize='porter unicode61'
+                    )
+                ''')
+                self.conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN
+                        INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+                    END
+                ''')
+                self.conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN
+                        INSERT INTO papers_fts(papers_fts, rowid, title, abstract)
+                        VALUES ('delete', old.id, old.title, old.abstract);
+                    END
+                ''')
+                self.conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS papers_fts_update AFTER UPDATE OF title, abstract ON papers BEGIN
+                        INSERT INTO papers_fts(papers_fts, rowid, title, abstract)
+                        VALUES ('delete', old.id, old.title, old.abstract);
+                        INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+                    END
+                ''')
+                if not exists:
+                    # Migration: index the papers stored before the FTS table existed
+                    self.conn.execute("INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError as e:
+            print(f"Warning: Full-text search unavailable ({e}), using LIKE search")
+            return False
+        return True
     
-    def content_hash(self, title, abstract):
+    @staticmethod
+    def content_hash(title, abstract):
         """Generate a hash to detect duplicates."""
         content = f"{title.lower().strip()}{abstract.lower().strip()}"
         return hashlib.md5(content.encode()).hexdigest()
@@ -125,70 +212,207 @@ class CorpusDatabase:
     def add_paper(self, title, abstract, source, source_id=None, authors=None, 
                   year=None, topics=None, url=None):
         """Add a paper to the database, returns True if added (not duplicate)."""
-        
+        status = self.add_papers([{
+            'title': title, 'abstract': abstract, 'source': source, 'source_id': source_id,
+            'authors': authors, 'year': year, 'topics': topics, 'url': url
+        }])[0]
+        return status == PAPER_INSERTED
+    
+    def _paper_row(self, paper, added_date):
+        """Insert parameters for a paper dict, or None if it is too short to keep."""
+        title, abstract = paper.get('title'), paper.get('abstract')
         if not title or not abstract or len(abstract) < 50:
-            return False
-        
-        content_hash = self.content_hash(title, abstract)
-        word_count = len(abstract.split())
-        
+            return None
+        return (
+            self.content_hash(title, abstract), title, abstract, paper.get('source'), paper.get('source_id'),
+            paper.get('authors'), paper.get('year'), paper.get('topics'), paper.get('url'),
+            added_date, len(abstract.split())
+        )
+    
+    def add_papers(self, papers):
+        """
+        Add many papers (dicts with add_paper's arguments) in one transaction.
+        Returns one status per paper: PAPER_INSERTED, PAPER_DUPLICATE (already
+        stored, or repeated earlier in the batch) or PAPER_INVALID.
+        """
+        added_date = datetime.now().isoformat()
+        statuses = []
+        seen = set()
+        
+        # IMMEDIATE takes the write lock up front, so the duplicate lookups stay valid until commit
+        self.conn.execute('BEGIN IMMEDIATE')
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT INTO papers 
-                (content_hash, title, abstract, source, source_id, authors, 
-                 year, topics, url, added_date, word_count)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                content_hash, title, abstract, source, source_id,
-                authors, year, topics, url,
-                datetime.now().isoformat(), word_count
-            ))
+            batch = []
+            for paper in papers:
+                batch.append(paper)
+                if len(batch) >= BULK_INSERT_BATCH:
+                    statuses += self._insert_batch(batch, added_date, seen)
+                    batch = []
+            if batch:
+                statuses += self._insert_batch(batch, added_date, seen)
             self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            # Duplicate
-            return False
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return statuses
+    
+    def _insert_batch(self, papers, added_date, seen):
+        rows = [self._paper_row(paper, added_date) for paper in papers]
+        hashes = list({row[0] for row in rows if row is not None} - seen)
+        
+        existing = set()
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            chunk = hashes[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            existing.update(r[0] for r in self.conn.execute(
+                f'SELECT content_hash FROM papers WHERE content_hash IN ({placeholders})', chunk
+            ))
+        
+        statuses = []
+        new_rows = []
+        for row in rows:
+            if row is None:
+                statuses.append(PAPER_INVALID)
+            elif row[0] in existing or row[0] in seen:
+                statuses.append(PAPER_DUPLICATE)
+            else:
+                seen.add(row[0])
+                new_rows.append(row)
+                statuses.append(PAPER_INSERTED)
+        
+        self.conn.executemany('''
+            INSERT OR IGNORE INTO papers 
+            (content_hash, title, abstract, source, source_id, authors, 
+             year, topics, url, added_date, word_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', new_rows)
+        return statuses
     
     def get_stats(self):
-        """Get corpus statistics."""
+        """Get corpus statistics (stored web abstracts are counted separately)."""
         cursor = self.conn.cursor()
         
-        cursor.execute('SELECT COUNT(*) as total FROM papers')
+        cursor.execute(f'SELECT COUNT(*) as total FROM papers WHERE {CORPUS_PAPERS_SQL}', (WEB_TOPIC,))
         total = cursor.fetchone()['total']
         
-        cursor.execute('SELECT source, COUNT(*) as count FROM papers GROUP BY source')
+        cursor.execute(f'SELECT source, COUNT(*) as count FROM papers WHERE {CORPUS_PAPERS_SQL} GROUP BY source', (WEB_TOPIC,))
         by_source = {row['source']: row['count'] for row in cursor.fetchall()}
         
-        cursor.execute('SELECT SUM(word_count) as total_words FROM papers')
+        cursor.execute(f'SELECT SUM(word_count) as total_words FROM papers WHERE {CORPUS_PAPERS_SQL}', (WEB_TOPIC,))
         total_words = cursor.fetchone()['total_words'] or 0
         
-        cursor.execute('SELECT MIN(year) as min_year, MAX(year) as max_year FROM papers WHERE year IS NOT NULL')
+        cursor.execute(f'''
+            SELECT MIN(year) as min_year, MAX(year) as max_year FROM papers
+            WHERE year IS NOT NULL AND {CORPUS_PAPERS_SQL}
+        ''', (WEB_TOPIC,))
         year_range = cursor.fetchone()
         
+        cursor.execute('SELECT COUNT(*) as total FROM papers WHERE topics = ?', (WEB_TOPIC,))
+        web_papers = cursor.fetchone()['total']
+        
         return {
             'total_papers': total,
             'by_source': by_source,
             'total_words': total_words,
-            'year_range': (year_range['min_year'], year_range['max_year']) if year_range['min_year'] else None
+            'year_range': (year_range['min_year'], year_range['max_year']) if year_range['min_year'] else None,
+            'web_papers': web_papers
         }
     
     def get_all_papers(self):
-        """Get all papers from database."""
+        """Get all corpus papers from database (without stored web abstracts)."""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM papers ORDER BY id')
+        cursor.execute(f'SELECT * FROM papers WHERE {CORPUS_PAPERS_SQL} ORDER BY id', (WEB_TOPIC,))
         return cursor.fetchall()
     
-    def search_papers(self, query):
-        """Search papers by title or abstract."""
+    @staticmethod
+    def fts_query(text, operator='AND', max_terms=None):
+        """
+        FTS5 MATCH expression for free text: each word quoted (so punctuation
+        and keywords like NEAR are literal), joined with AND / OR. With
+        max_terms, only the most frequent distinct words are kept.
+        """
+        words = re.findall(r'\w+', text.lower())
+        if max_terms is not None:
+            words = [word for word, _ in Counter(w for w in words if len(w) > 2).most_common(max_terms)]
+        else:
+            words = list(dict.fromkeys(words))
+        return f' {operator} '.join(f'"{word}"' for word in words)
+    
+    def _table_exists(self, name):
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone() is not None
+    
+    def search_papers(self, query, limit=None):
+        """Search papers by title or abstract (BM25-ranked when full-text search is available)."""
         cursor = self.conn.cursor()
+        # Queries without words (e.g. '') keep the substring behaviour: '' lists every paper
+        match = self.fts_query(query) if self.has_fts else None
+        if not match:
+            cursor.execute('''
+                SELECT * FROM papers 
+                WHERE title LIKE ? OR abstract LIKE ?
+                ORDER BY id
+                LIMIT ?
+            ''', (f'%{query}%', f'%{query}%', -1 if limit is None else limit))
+            return cursor.fetchall()
+        
         cursor.execute('''
-            SELECT * FROM papers 
-            WHERE title LIKE ? OR abstract LIKE ?
-            ORDER BY id
-        ''', (f'%{query}%', f'%{query}%'))
+            SELECT papers.* FROM papers_fts
+            JOIN papers ON papers.id = papers_fts.rowid
+            WHERE papers_fts MATCH ?
+            ORDER BY bm25(papers_fts, ?, ?)
+            LIMIT ?
+        ''', (match, FTS_TITLE_WEIGHT, FTS_ABSTRACT_WEIGHT, -1 if limit is None else limit))
         return cursor.fetchall()
     
+    def search_candidates(self, text, limit=200, max_terms=FTS_QUERY_TERMS):
+        """
+        Candidate retrieval for a whole document: ids of the papers sharing the
+        most weight with its frequent terms (BM25 over an OR query), best first.
+        Returns None when full-text search is unavailable.
+        """
+        if not self.has_fts:
+            return None
+        match = self.fts_query(text, operator='OR', max_terms=max_terms)
+        if not match:
+            return []
+        cursor = self.conn.execute('''
+            SELECT rowid FROM papers_fts
+            WHERE papers_fts MATCH ?
+            ORDER BY bm25(papers_fts, ?, ?)
+            LIMIT ?
+        ''', (match, FTS_TITLE_WEIGHT, FTS_ABSTRACT_WEIGHT, limit))
+        return [row[0] for row in cursor.fetchall()]
+    
+    def iter_papers(self, batch_size=PAPER_BATCH_SIZE, after_id=0, exclude_topics=None):
+        """Yield papers with id > after_id as lists of up to batch_size rows (one sequential scan)."""
+        query = 'SELECT * FROM papers WHERE id > ?'
+        params = [after_id]
+        if exclude_topics:
+            query += f" AND (topics IS NULL OR topics NOT IN ({','.join('?' * len(exclude_topics))}))"
+            params += list(exclude_topics)
+        cursor = self.conn.execute(query + ' ORDER BY id', params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    
+    def get_paper_ids(self, exclude_topics=None):
+        """Set of stored paper ids."""
+        query = 'SELECT id FROM papers'
+        params = []
+        if exclude_topics:
+            query += f" WHERE topics IS NULL OR topics NOT IN ({','.join('?' * len(exclude_topics))})"
+            params = list(exclude_topics)
+        return {row[0] for row in self.conn.execute(query, params)}
+    
+    def get_export_names(self):
+        """Map the file names export_to_files writes to their paper ids."""
+        cursor = self.conn.execute(f'SELECT id, source, title FROM papers WHERE {CORPUS_PAPERS_SQL}', (WEB_TOPIC,))
+        return {export_filename(row): row['id'] for row in cursor}
+    
     def log_download(self, query, source, found, added):
         """Log download activity."""
         cursor = self.conn.cursor()
@@ -203,28 +427,46 @@ class CorpusDatabase:
             self.conn.close()
 
 
+def paper_document(paper):
+    """Document text of a paper, as exported to corpus files and indexed from the database."""
+    return f"""Title: {paper['title']}
+
+Source: {paper['source']}
+Authors: {paper['authors'] or 'Unknown'}
+Year: {paper['year'] or 'Unknown'}
+URL: {paper['url'] or 'N/A'}
+
+Abstract:
+{paper['abstract']}
+"""
+
+
+def export_filename(paper):
+    """File name export_to_files gives a paper: <source>_<id>_<title>.txt"""
+    safe_title = "".join(c if c.isalnum() or c in ' _-' else '' 
+                         for c in paper['title'][:40])
+    safe_title = safe_title.replace(' ', '_').lower()
+    return f"{paper['source']}_{paper['id']:04d}_{safe_title}.txt"
+
+
 # ============================================================================
 # API Fetchers
 # ============================================================================
 
-def create_ssl_context():
-    """Create SSL context that works on Windows."""
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-    return ctx
-
-
 def fetch_arxiv(query, max_results=50):
     """Fetch papers from arXiv API."""
     papers = []
     
-    query_encoded = urllib.parse.quote(query)
-    url = f"{ARXIV_API}?search_query=all:{query_encoded}&start=0&max_results={max_results}"
+    params = {
+        'search_query': f'all:{query}',
+        'start': 0,
+        'max_results': max_results
+    }
     
     try:
-        response = urllib.request.urlopen(url, timeout=30)
-        xml_data = response.read().decode('utf-8')
+        response = http_client.get(ARXIV_API, params=params, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        xml_data = response.content
         
         root = ET.fromstring(xml_data)
         namespace = {'atom': 'http://www.w3.org/2005/Atom'}
@@ -271,21 +513,17 @@ def fetch_semantic_scholar(query, max_results=50):
     """Fetch papers from Semantic Scholar API."""
     papers = []
     
-    params = urllib.parse.urlencode({
+    params = {
         'query': query,
         'limit': min(max_results, 100),
         'fields': 'title,abstract,authors,year,externalIds,url'
-    })
-    
-    url = f"{SEMANTIC_SCHOLAR_API}?{params}"
+    }
     
     try:
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'PlagiarismDetector/1.0')
-        
-        ctx = create_ssl_context()
-        response = urllib.request.urlopen(req, timeout=30, context=ctx)
-        data = json.loads(response.read().decode('utf-8'))
+        response = http_client.get(SEMANTIC_SCHOLAR_API, params=params, timeout=FETCH_TIMEOUT,
+                                   headers={'User-Agent': 'PlagiarismDetector/1.0'})
+        response.raise_for_status()
+        data = response.json()
         
         for paper in data.get('data', []):
             if paper.get('abstract'):
@@ -312,21 +550,17 @@ def fetch_crossref(query, max_results=50):
     """Fetch papers from CrossRef API."""
     papers = []
     
-    params = urllib.parse.urlencode({
+    params = {
         'query': query,
         'rows': min(max_results, 100),
         'filter': 'has-abstract:true'
-    })
-    
-    url = f"{CROSSREF_API}?{params}"
+    }
     
     try:
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'PlagiarismDetector/1.0 (mailto:user@example.com)')
-        
-        ctx = create_ssl_context()
-        response = urllib.request.urlopen(req, timeout=30, context=ctx)
-        data = json.loads(response.read().decode('utf-8'))
+        response = http_client.get(CROSSREF_API, params=params, timeout=FETCH_TIMEOUT,
+                                   headers={'User-Agent': 'PlagiarismDetector/1.0 (mailto:user@example.com)'})
+        response.raise_for_status()
+        data = response.json()
         
         for item in data.get('message', {}).get('items', []):
             abstract = item.get('abstract', '')
@@ -366,21 +600,17 @@ def fetch_openalex(query, max_results=50):
     """Fetch papers from OpenAlex API (free and open)."""
     papers = []
     
-    params = urllib.parse.urlencode({
+    params = {
         'search': query,
         'per-page': min(max_results, 200),
         'filter': 'has_abstract:true'
-    })
-    
-    url = f"{OPENALEX_API}?{params}"
+    }
     
     try:
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'mailto:user@example.com')
-        
-        ctx = create_ssl_context()
-        response = urllib.request.urlopen(req, timeout=30, context=ctx)
-        data = json.loads(response.read().decode('utf-8'))
+        response = http_client.get(OPENALEX_API, params=params, timeout=FETCH_TIMEOUT,
+                                   headers={'User-Agent': 'mailto:user@example.com'})
+        response.raise_for_status()
+        data = response.json()
         
         for work in data.get('results', []):
             abstract_inverted = work.get('abstract_inverted_index', {})
@@ -455,11 +685,7 @@ class CorpusBuilder:
             
             papers = fetcher(topic, count_per_source)
             found = len(papers)
-            added = 0
-            
-            for paper in papers:
-                if self.db.add_paper(**paper):
-                    added += 1
+            added = self.db.add_papers(papers).count(PAPER_INSERTED)
             
             total_found += found
             total_added += added
@@ -503,6 +729,8 @@ class CorpusBuilder:
         
         if stats['year_range']:
             print(f"   Year Range:   {stats['year_range'][0]} - {stats['year_range'][1]}")
+        if stats['web_papers']:
+            print(f"   Web Abstracts: {stats['web_papers']:,} (stored by web search, not exported)")
         
         print("\n   Papers by Source:")
         for source, count in stats['by_source'].items():
@@ -521,26 +749,10 @@ class CorpusBuilder:
         print(f"\n📤 Exporting {len(papers)} papers to '{folder}/'...")
         
         for paper in papers:
-            # Create filename from title
-            safe_title = "".join(c if c.isalnum() or c in ' _-' else '' 
-                                 for c in paper['title'][:40])
-            safe_title = safe_title.replace(' ', '_').lower()
-            filename = f"{paper['source']}_{paper['id']:04d}_{safe_title}.txt"
-            filepath = os.path.join(folder, filename)
-            
-            content = f"""Title: {paper['title']}
-
-Source: {paper['source']}
-Authors: {paper['authors'] or 'Unknown'}
-Year: {paper['year'] or 'Unknown'}
-URL: {paper['url'] or 'N/A'}
-
-Abstract:
-{paper['abstract']}
-"""
+            filepath = os.path.join(folder, export_filename(paper))
             
             with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
+                f.write(paper_document(paper))
         
         print(f"   ✅ Exported {len(papers)} papers!")
     
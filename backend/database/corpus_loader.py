@@ -0,0 +1,76 @@
+"""
+Database-backed corpus loader for PLAUGE
+Streams the papers table into the corpus index instead of opening one
+exported .txt file per paper:
+- One sequential, id-ordered scan, fetched in batches
+- Papers get the same text CorpusBuilder.export_to_files writes, so they
+  score like the exported files (with real titles and topics as metadata)
+- Stored web abstracts keep the text and metadata of the web search stage
+- Exported corpus files are recognised by the exact names export_to_files
+  gives their rows, so they can be skipped or linked to their paper ids
+"""
+
+import os
+
+from backend.database.corpus_builder import CorpusDatabase, PAPER_BATCH_SIZE, WEB_TOPIC, paper_document
+from backend.database.web_ingestor import web_paper_name
+
+
+def paper_name(row):
+    """Match-list metadata for a stored paper"""
+    return {
+        'title': row['title'],
+        'category': row['topics'] or 'uncategorized',
+        'authors': row['authors'] or '',
+        'url': row['url'] or '',
+        'paper_id': row['id'],
+        'content_hash': row['content_hash']
+    }
+
+
+def iter_corpus_batches(db_file, batch_size=PAPER_BATCH_SIZE, include_web=True, paper_ids=None):
+    """Yield (documents, names) per batch of papers rows (only `paper_ids` if given)"""
+    if not os.path.exists(db_file):
+        return
+
+    after_id = min(paper_ids) - 1 if paper_ids else 0
+    db = CorpusDatabase(db_file)
+    try:
+        exclude = None if include_web else [WEB_TOPIC]
+        for rows in db.iter_papers(batch_size, after_id=after_id, exclude_topics=exclude):
+            documents, names = [], []
+            for row in rows:
+                if paper_ids is not None and row['id'] not in paper_ids:
+                    continue
+                if row['topics'] == WEB_TOPIC:
+                    documents.append(row['abstract'])
+                    names.append(web_paper_name(row))
+                else:
+                    documents.append(paper_document(row))
+                    names.append(paper_name(row))
+            if documents:
+                yield documents, names
+    finally:
+        db.close()
+
+
+def stored_paper_ids(db_file, include_web=True):
+    """Ids of the papers a database-backed corpus should contain"""
+    if not os.path.exists(db_file):
+        return set()
+    db = CorpusDatabase(db_file)
+    try:
+        return db.get_paper_ids(exclude_topics=None if include_web else [WEB_TOPIC])
+    finally:
+        db.close()
+
+
+def exported_paper_ids(db_file):
+    """{export file name: paper id} for every row CorpusBuilder.export_to_files would write"""
+    if not os.path.exists(db_file):
+        return {}
+    db = CorpusDatabase(db_file)
+    try:
+        return db.get_export_names()
+    finally:
+        db.close()
@@ -0,0 +1,128 @@
+"""
+Analysis History Store for PLAUGE
+Keeps the analysis history in SQLite instead of rewriting history.json on
+every request:
+- One indexed INSERT per analysis; retention is enforced by deleting only
+  the rows that fell out of the window
+- WAL journal + busy timeout, so concurrent requests / worker processes
+  append without losing records
+- Newest-first pages filtered by file name and timestamp range
+- The legacy history.json is imported once on first open
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+HISTORY_DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.db')
+
+# Records kept (oldest are dropped first); None keeps everything
+MAX_HISTORY_RECORDS = 10000
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# PRAGMA user_version once the legacy JSON history has been imported
+SCHEMA_VERSION = 1
+
+
+class HistoryStore:
+    """SQLite-backed, newest-first log of analysis summaries"""
+
+    def __init__(self, db_file=HISTORY_DB_FILE, max_records=MAX_HISTORY_RECORDS, legacy_file=None):
+        self.db_file = db_file
+        self.max_records = max_records
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_tables()
+        self._migrate(legacy_file)
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS history (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    file_name TEXT,
+                    record TEXT NOT NULL
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_history_file_name ON history(file_name)')
+
+    def _migrate(self, legacy_file):
+        """Import the old history.json (newest-first list) once"""
+        with self.lock, self.conn:
+            if self.conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+                return
+            records = []
+            if legacy_file and os.path.exists(legacy_file):
+                try:
+                    with open(legacy_file, 'r') as f:
+                        records = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: Could not import {legacy_file} ({e})")
+            if records:
+                self.conn.executemany(
+                    'INSERT INTO history (id, timestamp, file_name, record) VALUES (?, ?, ?, ?)',
+                    [self._row(record) for record in reversed(records)]
+                )
+                print(f"🗄️  Imported {len(records)} history records from {legacy_file}")
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    @staticmethod
+    def _row(record):
+        return (str(record.get('id', '')), record.get('timestamp', ''), record.get('fileName'), json.dumps(record))
+
+    def add(self, record):
+        """Stamp the record with an id and timestamp and append it; returns the stored record"""
+        record = dict(record)
+        record['id'] = str(int(time.time() * 1000))
+        record['timestamp'] = time.strftime('%Y-%m-%d %H:%M:%S')
+
+        with self.lock, self.conn:
+            seq = self.conn.execute(
+                'INSERT INTO history (id, timestamp, file_name, record) VALUES (?, ?, ?, ?)', self._row(record)
+            ).lastrowid
+            if self.max_records:
+                # seq only grows, so this removes at most the few rows that just left the window
+                self.conn.execute('DELETE FROM history WHERE seq <= ?', (seq - self.max_records,))
+        return record
+
+    def page(self, limit=DEFAULT_PAGE_SIZE, offset=0, file_name=None, since=None, until=None):
+        """(records newest first, total matching) for one page of the history"""
+        conditions, params = [], []
+        if file_name:
+            conditions.append('file_name = ?')
+            params.append(file_name)
+        if since:
+            conditions.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            conditions.append('timestamp <= ?')
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        limit = max(0, min(int(limit), MAX_PAGE_SIZE))
+
+        with self.lock:
+            total = self.conn.execute(f'SELECT COUNT(*) FROM history {where}', params).fetchone()[0]
+            rows = self.conn.execute(
+                f'SELECT record FROM history {where} ORDER BY seq DESC LIMIT ? OFFSET ?',
+                params + [limit, max(0, int(offset))]
+            ).fetchall()
+        return [json.loads(row['record']) for row in rows], total
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM history')
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
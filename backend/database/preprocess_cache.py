@@ -0,0 +1,124 @@
+"""
+Preprocessed Text Cache for PLAUGE
+Persists TextPreprocessor output in a sidecar SQLite file keyed by content
+hash and preprocessor version, so server restarts and new workers only
+reprocess corpus files that are new or have changed. Entries of an older
+preprocessor version are dropped the first time a new one uses the cache.
+"""
+
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+
+
+PREPROCESS_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preprocess_cache.db')
+
+# Max number of SQLite host parameters used in one IN (...) lookup
+LOOKUP_BATCH_SIZE = 500
+
+
+class PreprocessCache:
+    """SQLite-backed cache of preprocessed document text."""
+
+    def __init__(self, db_file=PREPROCESS_CACHE_FILE):
+        self.db_file = db_file
+        self.conn = None
+        self._connect()
+        self._create_tables()
+
+    def _connect(self):
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+    def _create_tables(self):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS preprocessed (
+                content_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                tokens TEXT NOT NULL,
+                added_date TEXT,
+                PRIMARY KEY (content_hash, version)
+            )
+        ''')
+        # Preprocessor version the entries were last pruned for
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cache_info (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        self.conn.commit()
+
+    @staticmethod
+    def content_hash(text):
+        """Hash of the raw document text."""
+        return hashlib.md5(text.encode('utf-8', errors='ignore')).hexdigest()
+
+    def get_many(self, hashes, version):
+        """Return {content_hash: tokens} for the hashes that are cached."""
+        found = {}
+        hashes = list(set(hashes))
+        cursor = self.conn.cursor()
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(f'''
+                SELECT content_hash, tokens FROM preprocessed
+                WHERE version = ? AND content_hash IN ({placeholders})
+            ''', [version] + batch)
+            for row in cursor.fetchall():
+                found[row['content_hash']] = row['tokens']
+        return found
+
+    def put_many(self, items, version):
+        """Store (content_hash, tokens) pairs in a single transaction."""
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO preprocessed (content_hash, version, tokens, added_date)
+                VALUES (?, ?, ?, ?)
+            ''', [(content_hash, version, tokens, now) for content_hash, tokens in items])
+
+    def preprocess(self, documents, preprocessor, workers=1):
+        """
+        Preprocess documents, reusing cached output where possible.
+        Cache misses are preprocessed as one batch (in parallel if workers != 1).
+        Returns (preprocessed_docs, number_of_cache_misses).
+        """
+        from backend.ml_models.plagiarism_detector import preprocess_many
+
+        version = preprocessor.VERSION
+        if self.current_version() != version:
+            self.prune(version)
+        hashes = [self.content_hash(doc) for doc in documents]
+        cached = self.get_many(hashes, version)
+
+        missing = {}
+        for doc, content_hash in zip(documents, hashes):
+            if content_hash not in cached and content_hash not in missing:
+                missing[content_hash] = doc
+
+        if missing:
+            tokens = preprocess_many(list(missing.values()), workers=workers, preprocessor=preprocessor)
+            new_items = list(zip(missing.keys(), tokens))
+            self.put_many(new_items, version)
+            cached.update(new_items)
+
+        return [cached[content_hash] for content_hash in hashes], len(missing)
+
+    def current_version(self):
+        """Preprocessor version the cache was last pruned for (None if never)."""
+        row = self.conn.execute("SELECT value FROM cache_info WHERE key = 'version'").fetchone()
+        return row['value'] if row else None
+
+    def prune(self, version):
+        """Drop entries written by other preprocessor versions."""
+        with self.conn:
+            self.conn.execute('DELETE FROM preprocessed WHERE version != ?', (version,))
+            self.conn.execute("INSERT OR REPLACE INTO cache_info (key, value) VALUES ('version', ?)", (version,))
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
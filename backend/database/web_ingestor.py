@@ -0,0 +1,148 @@
+"""
+Web Abstract Ingestor for PLAUGE
+Write-behind pipeline that stores abstracts found by the web search stage in
+the corpus database, so the local corpus grows with every analysis:
+- submit() is non-blocking; papers are queued for a background thread
+- The thread inserts each batch via CorpusDatabase.add_papers (deduplicated by content hash)
+- Newly inserted papers are handed to a callback (e.g. to add them to the live index)
+"""
+
+import os
+import queue
+import threading
+
+from backend.database.corpus_builder import CorpusDatabase, PAPER_INSERTED, WEB_TOPIC
+
+
+def paper_year(published):
+    try:
+        return int(str(published)[:4])
+    except (TypeError, ValueError):
+        return None
+
+
+def paper_hash(paper):
+    return CorpusDatabase.content_hash(paper.get('title') or '', paper.get('abstract') or '')
+
+
+def web_paper_name(row):
+    """Match-list metadata for a stored web paper (same shape as web results in /api/analyze)"""
+    return {
+        'title': row['title'],
+        'category': f"Web - {row['source']}",
+        'authors': row['authors'] or '',
+        'url': row['url'] or '',
+        'paper_id': row['id'],
+        'content_hash': row['content_hash']
+    }
+
+
+def load_web_papers(db_file):
+    """Load previously ingested web papers as (documents, names)"""
+    documents = []
+    names = []
+    if not os.path.exists(db_file):
+        return documents, names
+
+    db = CorpusDatabase(db_file)
+    try:
+        cursor = db.conn.cursor()
+        cursor.execute('SELECT * FROM papers WHERE topics = ? ORDER BY id', (WEB_TOPIC,))
+        for row in cursor.fetchall():
+            documents.append(row['abstract'])
+            names.append(web_paper_name(row))
+    finally:
+        db.close()
+    return documents, names
+
+
+class WebAbstractIngestor:
+    """Background writer of web search hits into the papers table."""
+
+    def __init__(self, db_file, on_added=None, known_hashes=None):
+        self.db_file = db_file
+        self.on_added = on_added
+        # Papers already handed to on_added (i.e. in the index), and papers already tried
+        self.known_hashes = set(known_hashes or [])
+        self.seen_hashes = set(self.known_hashes)
+        self.queue = queue.Queue()
+        self.stats = {'queued': 0, 'added': 0, 'duplicates': 0, 'errors': 0}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='web-ingestor', daemon=True)
+                self._thread.start()
+        return self
+
+    def is_known(self, paper):
+        """True if the paper was ingested earlier and is already part of the index"""
+        return paper_hash(paper) in self.known_hashes
+
+    def submit(self, papers):
+        """Queue web search results for insertion; returns immediately"""
+        papers = [
+            p for p in papers
+            if p.get('title') and p.get('abstract') and not p.get('abstract_is_fallback')
+        ]
+        if papers:
+            self.stats['queued'] += len(papers)
+            self.queue.put(papers)
+            self.start()
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        self.queue.join()
+
+    def _run(self):
+        db = CorpusDatabase(self.db_file)
+        try:
+            while True:
+                papers = self.queue.get()
+                try:
+                    self._ingest(db, papers)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    print(f"Web ingest error: {e}")
+                finally:
+                    self.queue.task_done()
+        finally:
+            db.close()
+
+    def _ingest(self, db, papers):
+        batch, hashes = [], []
+        for paper in papers:
+            content_hash = paper_hash(paper)
+            if content_hash in self.seen_hashes:
+                self.stats['duplicates'] += 1
+                continue
+            hashes.append(content_hash)
+            batch.append({
+                'title': paper['title'],
+                'abstract': paper['abstract'],
+                'source': paper.get('source'),
+                'source_id': str(paper.get('id', '')) or None,
+                'authors': paper.get('authors'),
+                'year': paper_year(paper.get('published')),
+                'topics': WEB_TOPIC,
+                'url': paper.get('url')
+            })
+        if not batch:
+            return
+
+        statuses = db.add_papers(batch)
+        self.seen_hashes.update(hashes)
+        inserted = [content_hash for content_hash, status in zip(hashes, statuses) if status == PAPER_INSERTED]
+        self.stats['duplicates'] += len(batch) - len(inserted)
+
+        added_rows = []
+        for content_hash in inserted:
+            added_rows.append(db.conn.execute('SELECT * FROM papers WHERE content_hash = ?', (content_hash,)).fetchone())
+
+        if added_rows:
+            self.stats['added'] += len(added_rows)
+            if self.on_added is not None:
+                self.on_added([row['abstract'] for row in added_rows], [web_paper_name(row) for row in added_rows])
+            self.known_hashes.update(row['content_hash'] for row in added_rows)
@@ -0,0 +1,121 @@
+"""
+Approximate nearest-neighbour index for PLAUGE
+Pre-selects corpus candidates so exact cosine scoring only runs on a
+shortlist instead of every document:
+- TruncatedSVD (LSA) projects TF-IDF rows into a small dense space
+- Spherical k-means splits the projected documents into inverted lists (IVF)
+- A query probes the lists with the closest centroids and ranks their members
+  by dense dot product; the best ones are re-scored exactly by the caller
+
+Pure NumPy apart from the SVD, so no extra dependency is needed.
+See tools/benchmark_ann.py for recall vs. latency against exhaustive search.
+"""
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+
+N_COMPONENTS = 128
+N_PROBE = 8
+KMEANS_ITERATIONS = 15
+
+
+class IVFIndex:
+    """LSA projection + inverted-file index over document ids"""
+
+    def __init__(self, n_components=N_COMPONENTS, n_lists=None, n_probe=N_PROBE, random_state=0):
+        self.n_components = n_components
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.random_state = random_state
+        self.svd = None
+        self.centroids = None
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.assign = np.zeros(0, dtype=np.int64)
+        self._lists = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def is_built(self):
+        return self.centroids is not None
+
+    def project(self, matrix):
+        """Unit-length dense LSA vectors for TF-IDF rows"""
+        return normalize(self.svd.transform(matrix)).astype(np.float32)
+
+    def build(self, matrix, ids):
+        """Fit the projection and the k-means lists on a corpus matrix"""
+        n_docs, n_features = matrix.shape
+        rng = np.random.default_rng(self.random_state)
+
+        components = max(1, min(self.n_components, n_docs - 1, n_features - 1))
+        self.svd = TruncatedSVD(n_components=components, random_state=self.random_state).fit(matrix)
+        vectors = self.project(matrix)
+
+        # Around sqrt(N) lists keeps both the centroid scan and the probed lists small
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_docs)))
+        n_lists = min(n_lists, n_docs)
+        centroids = vectors[rng.choice(n_docs, n_lists, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            sizes = np.bincount(assign, minlength=n_lists)
+            # Empty lists are re-seeded from random documents
+            empty = sizes == 0
+            sums[empty] = vectors[rng.choice(n_docs, int(empty.sum()))]
+            centroids = normalize(sums).astype(np.float32)
+
+        self.centroids = centroids
+        self.vectors = vectors
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.assign = np.argmax(vectors @ centroids.T, axis=1)
+        self._lists = None
+        return self
+
+    def add(self, matrix, ids):
+        """Assign new documents to their closest existing list (no refit)"""
+        vectors = self.project(matrix)
+        self.vectors = np.vstack([self.vectors, vectors])
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.assign = np.concatenate([self.assign, np.argmax(vectors @ self.centroids.T, axis=1)])
+        self._lists = None
+
+    def remove(self, ids):
+        keep = ~np.isin(self.ids, np.asarray(list(ids), dtype=np.int64))
+        self.vectors = self.vectors[keep]
+        self.ids = self.ids[keep]
+        self.assign = self.assign[keep]
+        self._lists = None
+
+    def _inverted_lists(self):
+        # Row order grouped by list, with each list's [start, stop) bounds
+        if self._lists is None:
+            order = np.argsort(self.assign, kind='stable')
+            bounds = np.searchsorted(self.assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, bounds)
+        return self._lists
+
+    def search(self, query_matrix, n_candidates=200, n_probe=None):
+        """Candidate document ids for each query row, most similar (in LSA space) first"""
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        order, bounds = self._inverted_lists()
+        queries = self.project(query_matrix)
+
+        results = []
+        for query, centroid_scores in zip(queries, queries @ self.centroids.T):
+            probed = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+            rows = np.concatenate([order[bounds[c]:bounds[c + 1]] for c in probed])
+            if len(rows) == 0:
+                results.append([])
+                continue
+            scores = self.vectors[rows] @ query
+            if len(rows) > n_candidates:
+                top = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+                rows, scores = rows[top], scores[top]
+            results.append(self.ids[rows[np.argsort(-scores, kind='stable')]].tolist())
+        return results
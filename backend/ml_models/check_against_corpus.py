@@ -3,19 +3,26 @@ PLAGIARISM CHECKER - Check submitted papers against a corpus of research papers.
 
 Folder Structure:
     corpus/     - Put existing research papers here (your reference database)
-    submit/     - Put the paper you want to check here
+    submit/     - Put the paper(s) you want to check here; all of them are
+                  scored in one batch and also compared with each other
 
 Usage:
-    python check_against_corpus.py
+    python check_against_corpus.py          # report submission pairs at >= 50% similarity
+    python check_against_corpus.py 0.3      # report submission pairs at >= 30% similarity
 """
 
 import os
-from backend.ml_models.plagiarism_detector import PlagiarismDetector, download_nltk_resources
+import sys
+from backend.ml_models.plagiarism_detector import CROSS_PAIR_THRESHOLD, PlagiarismDetector, download_nltk_resources
+from backend.ml_models.corpus_index import CorpusIndex
 
 
 CORPUS_FOLDER = "corpus"
 SUBMIT_FOLDER = "submit"
 
+# Submission-vs-submission pairs below this similarity are not reported (same default as /api/analyze/batch)
+CROSS_THRESHOLD = CROSS_PAIR_THRESHOLD
+
 
 def setup_folders():
     for folder in [CORPUS_FOLDER, SUBMIT_FOLDER]:
@@ -43,28 +50,42 @@ def load_txt_files(folder_path):
     return documents, filenames
 
 
-def check_paper_against_corpus(submitted_doc, submitted_name, corpus_docs, corpus_names):
-    all_docs = [submitted_doc] + corpus_docs
-    
+def check_paper_against_corpus(submitted_doc, submitted_name, corpus_docs, corpus_names, corpus_index=None, top_k=None):
     detector = PlagiarismDetector()
-    detector.add_documents(all_docs)
-    results = detector.analyze()
+    if corpus_index is None:
+        corpus_index = CorpusIndex().build(corpus_docs, corpus_names)
+    
+    results = detector.score_against([submitted_doc], corpus_index, top_k=top_k)[0]
     
     matches = []
-    for result in results['pairwise_results']:
-        if result['doc1_index'] == 0:
-            corpus_idx = result['doc2_index'] - 1
-            matches.append({
-                'corpus_file': corpus_names[corpus_idx],
-                'similarity_score': result['similarity_score'],
-                'similarity_percentage': result['similarity_percentage'],
-                'plagiarism_level': result['plagiarism_level']
-            })
-    
-    matches.sort(key=lambda x: x['similarity_score'], reverse=True)
+    for result in results:
+        matches.append({
+            'corpus_file': corpus_names[result['corpus_index']],
+            'similarity_score': result['similarity_score'],
+            'similarity_percentage': result['similarity_percentage'],
+            'plagiarism_level': result['plagiarism_level']
+        })
+    
     return matches
 
 
+def check_batch_against_corpus(submit_docs, corpus_names, corpus_index, top_k=None, cross_threshold=CROSS_THRESHOLD):
+    """Score every submission against the corpus in one pass, plus submission-vs-submission pairs"""
+    detector = PlagiarismDetector(workers=None)
+    results, cross_pairs = detector.score_batch(submit_docs, corpus_index, top_k=top_k, cross_threshold=cross_threshold)
+    
+    all_matches = []
+    for doc_results in results:
+        all_matches.append([{
+            'corpus_file': corpus_names[result['corpus_index']],
+            'similarity_score': result['similarity_score'],
+            'similarity_percentage': result['similarity_percentage'],
+            'plagiarism_level': result['plagiarism_level']
+        } for result in doc_results])
+    
+    return all_matches, cross_pairs
+
+
 def get_color(score):
     if score >= 0.8:
         return "\033[91m"  # Red
@@ -118,7 +139,30 @@ def print_results(submitted_name, matches):
     print("=" * 70 + "\n")
 
 
-def main():
+def print_cross_results(submit_names, cross_pairs, cross_threshold=CROSS_THRESHOLD):
+    RESET = "\033[0m"
+    BOLD = "\033[1m"
+    
+    print("\n" + "=" * 70)
+    print(f"{BOLD}🔁 CROSS-SUBMISSION SIMILARITY{RESET}")
+    print("=" * 70)
+    
+    if not cross_pairs:
+        print(f"\n   No submission pairs at or above {cross_threshold * 100:.0f}% similarity.")
+    
+    for pair in cross_pairs:
+        color = get_color(pair['similarity_score'])
+        print(f"\n   {submit_names[pair['doc1_index']]} vs {submit_names[pair['doc2_index']]}")
+        print(f"      Similarity: {color}{pair['similarity_percentage']}%{RESET}")
+        print(f"      Level: {color}{pair['plagiarism_level']}{RESET}")
+    
+    print("\n" + "=" * 70 + "\n")
+
+
+def main(cross_threshold=None):
+    if cross_threshold is None:
+        cross_threshold = CROSS_THRESHOLD
+    
     print("\n" + "=" * 70)
     print("     PLAGIARISM CHECKER - Check Against Research Paper Corpus")
     print("=" * 70)
@@ -147,13 +191,25 @@ def main():
         print(f"   Add your .txt file to the '{SUBMIT_FOLDER}/' folder.\n")
         return
     
-    for i, (doc, name) in enumerate(zip(submit_docs, submit_names)):
-        print(f"\n🔍 Checking: {name}...")
-        matches = check_paper_against_corpus(doc, name, corpus_docs, corpus_names)
+    print(f"\n🧮 Indexing corpus...")
+    corpus_index = CorpusIndex(workers=None).build(corpus_docs, corpus_names)
+    
+    print(f"\n🔍 Checking {len(submit_docs)} paper(s)...")
+    if len(submit_docs) == 1:
+        # Nothing to cross-check a single paper against
+        all_matches = [check_paper_against_corpus(submit_docs[0], submit_names[0], corpus_docs, corpus_names, corpus_index)]
+    else:
+        all_matches, cross_pairs = check_batch_against_corpus(submit_docs, corpus_names, corpus_index,
+                                                              cross_threshold=cross_threshold)
+    
+    for name, matches in zip(submit_names, all_matches):
         print_results(name, matches)
     
+    if len(submit_docs) > 1:
+        print_cross_results(submit_names, cross_pairs, cross_threshold)
+    
     print("✅ All checks complete!\n")
 
 
 if __name__ == "__main__":
-    main()
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else None)
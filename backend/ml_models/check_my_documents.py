@@ -92,7 +92,7 @@ def main():
     print(f"\n✅ Loaded {len(documents)} documents")
     
     print("\n🔍 Analyzing for plagiarism...\n")
-    detector = PlagiarismDetector()
+    detector = PlagiarismDetector(workers=None)
     detector.add_documents(documents)
     results = detector.analyze()
     
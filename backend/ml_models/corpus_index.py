@@ -0,0 +1,326 @@
+"""
+Corpus Index for PLAUGE
+Fits the TF-IDF vectorizer over the reference corpus once and keeps the
+sparse corpus matrix resident, so each request only transforms the new
+(submitted / web) documents instead of refitting over everything.
+
+Documents can be appended or removed afterwards without a refit: raw term
+counts and document frequencies are kept alongside the matrix, so an update
+only counts the changed documents and re-derives the IDF weights. The
+vocabulary stays the one chosen at the last full build until `needs_rebuild`
+says enough of the corpus has changed to refit.
+
+With `use_fingerprints=True` a winnowing FingerprintIndex is kept in sync
+with the corpus, so `candidate_positions` can pre-select the documents that
+share copied passages with a submission before any cosine scoring.
+With `use_ann=True` an LSA + IVF index (ann_index) does the same for
+topically similar documents through `ann_positions`.
+
+`save()` writes the index in the memory-mappable format of index_store, and
+`CorpusIndex.load()` opens it again without refitting or re-reading the corpus.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+from backend.ml_models.plagiarism_detector import TextPreprocessor, TfidfFeatureExtractor, preprocess_many
+from backend.ml_models.fingerprint_index import FingerprintIndex
+from backend.ml_models.ann_index import IVFIndex
+from backend.ml_models import index_store
+
+
+# Refit the vocabulary once this fraction of the corpus changed since the last build
+REBUILD_RATIO = 0.25
+
+
+class CorpusIndex:
+    """Pre-fitted TF-IDF index over the reference corpus"""
+
+    def __init__(self, max_features=5000, ngram_range=(1, 2), workers=1, fast=False, use_fingerprints=False, use_ann=False,
+                 source=None):
+        self.max_features = max_features
+        # Caller's description of where the documents come from (JSON-serialisable); part of params()
+        self.source = source
+        self.ngram_range = tuple(ngram_range)
+        self.workers = workers
+        self.fingerprints = FingerprintIndex() if use_fingerprints else None
+        self.ann = IVFIndex() if use_ann else None
+        self.preprocessor = TextPreprocessor(fast=fast)
+        self.feature_extractor = TfidfFeatureExtractor(max_features=max_features, ngram_range=self.ngram_range)
+        self.documents = []
+        self.names = []
+        self.preprocessed_docs = []
+        self.matrix = None
+        self.counts = None
+        self.doc_freq = None
+        # Stable per-document ids (positions shift when documents are removed)
+        self.doc_ids = []
+        self._positions = {}
+        # Lazily built {value: position} maps over name fields, see positions_by()
+        self._field_positions = {}
+        # Per-term sums of the matrix rows, see similarity_sum()
+        self._column_sums = None
+        self._next_id = 0
+        self.changes_since_build = 0
+        # Held while the index changes; readers take it to get a consistent snapshot
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    @property
+    def is_built(self):
+        return self.matrix is not None
+
+    @property
+    def needs_rebuild(self):
+        """True once enough documents changed that the frozen vocabulary is stale"""
+        return self.changes_since_build > REBUILD_RATIO * max(len(self.documents), 1)
+
+    def build(self, documents, names=None, preprocessed_docs=None):
+        """Fit the vectorizer on the corpus and keep the sparse matrix resident"""
+        if not documents:
+            raise ValueError("Cannot build a corpus index from an empty corpus")
+
+        if preprocessed_docs is None:
+            preprocessed_docs = preprocess_many(documents, workers=self.workers, preprocessor=self.preprocessor)
+
+        with self.lock:
+            self.feature_extractor.fit(preprocessed_docs)
+            counts = self.feature_extractor.count(preprocessed_docs)
+            doc_ids = self._new_ids(len(documents))
+            if self.fingerprints is not None:
+                self.fingerprints.clear()
+                self.fingerprints.add_many(doc_ids, preprocessed_docs)
+            self._set_state(
+                list(documents),
+                list(names) if names is not None else [{} for _ in documents],
+                list(preprocessed_docs),
+                counts,
+                self._doc_freq(counts),
+                doc_ids
+            )
+            if self.ann is not None:
+                self.ann.build(self.matrix, doc_ids)
+            self.changes_since_build = 0
+        return self
+
+    def add_documents(self, documents, names=None, preprocessed_docs=None):
+        """Append documents without refitting the vocabulary; returns how many were added"""
+        if not documents:
+            return 0
+        if not self.is_built:
+            self.build(documents, names, preprocessed_docs)
+            return len(documents)
+
+        if preprocessed_docs is None:
+            preprocessed_docs = preprocess_many(documents, workers=self.workers, preprocessor=self.preprocessor)
+        if names is None:
+            names = [{} for _ in documents]
+
+        new_counts = self.feature_extractor.count(preprocessed_docs)
+        with self.lock:
+            new_ids = self._new_ids(len(documents))
+            if self.fingerprints is not None:
+                self.fingerprints.add_many(new_ids, preprocessed_docs)
+            self._set_state(
+                self.documents + list(documents),
+                self.names + list(names),
+                self.preprocessed_docs + list(preprocessed_docs),
+                sp.vstack([self.counts, new_counts], format='csr'),
+                self.doc_freq + self._doc_freq(new_counts),
+                self.doc_ids + new_ids
+            )
+            if self.ann is not None:
+                # New rows join the existing lists; the projection is refit on the next build
+                self.ann.add(self.matrix[-len(new_ids):], new_ids)
+            self.changes_since_build += len(documents)
+        return len(documents)
+
+    def remove_documents(self, predicate):
+        """Remove every document whose name dict matches predicate; returns how many were removed"""
+        with self.lock:
+            keep = [i for i, name in enumerate(self.names) if not predicate(name)]
+            removed = len(self.names) - len(keep)
+            if not removed:
+                return 0
+            if not keep:
+                raise ValueError("Cannot remove every document from the corpus index")
+
+            dropped = np.setdiff1d(np.arange(len(self.names)), keep)
+            dropped_ids = [self.doc_ids[i] for i in dropped]
+            if self.fingerprints is not None:
+                for doc_id in dropped_ids:
+                    self.fingerprints.remove(doc_id)
+            if self.ann is not None:
+                self.ann.remove(dropped_ids)
+            self._set_state(
+                [self.documents[i] for i in keep],
+                [self.names[i] for i in keep],
+                [self.preprocessed_docs[i] for i in keep],
+                self.counts[keep],
+                self.doc_freq - self._doc_freq(self.counts[dropped]),
+                [self.doc_ids[i] for i in keep]
+            )
+            self.changes_since_build += removed
+        return removed
+
+    @staticmethod
+    def _doc_freq(counts):
+        # Number of documents containing each term
+        return np.bincount(counts.indices, minlength=counts.shape[1])
+
+    def _new_ids(self, count):
+        ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        return ids
+
+    def _set_state(self, documents, names, preprocessed_docs, counts, doc_freq, doc_ids):
+        # Lists are replaced rather than mutated, so readers holding old references stay consistent
+        counts.sum_duplicates()
+        self.doc_ids = doc_ids
+        self._positions = {doc_id: pos for pos, doc_id in enumerate(doc_ids)}
+        self._field_positions = {}
+        self._column_sums = None
+        self.documents = documents
+        self.names = names
+        self.preprocessed_docs = preprocessed_docs
+        self.counts = counts
+        self.doc_freq = doc_freq
+        self.matrix = self.feature_extractor.reweight(counts, doc_freq, len(documents))
+
+    def candidate_positions(self, preprocessed_text, limit=200):
+        """
+        Corpus positions of documents sharing fingerprints with the text, best first.
+        Returns None when fingerprinting is disabled (callers should score everything).
+        """
+        if self.fingerprints is None:
+            return None
+        with self.lock:
+            return [self._positions[doc_id] for doc_id, _, _ in self.fingerprints.query(preprocessed_text, top_k=limit)]
+
+    def ann_positions(self, query_vector, limit=200):
+        """
+        Corpus positions of the documents nearest the TF-IDF query vector in LSA space, best first.
+        Returns None when the ANN index is disabled (callers should score everything).
+        """
+        if self.ann is None:
+            return None
+        with self.lock:
+            return [self._positions[doc_id] for doc_id in self.ann.search(query_vector, n_candidates=limit)[0]]
+
+    def positions_by(self, field, values):
+        """Corpus positions of the documents whose name[field] is in values, in the order of values"""
+        with self.lock:
+            lookup = self._field_positions.get(field)
+            if lookup is None:
+                lookup = {name[field]: pos for pos, name in enumerate(self.names) if name.get(field) is not None}
+                self._field_positions[field] = lookup
+            return [lookup[value] for value in values if value in lookup]
+
+    def similarity_sum(self, query_vector):
+        """Sum of a query row's cosine similarities to every corpus document, without scoring each one"""
+        with self.lock:
+            if self._column_sums is None:
+                self._column_sums = np.asarray(self.matrix.sum(axis=0)).ravel()
+            column_sums = self._column_sums
+        # Rows are L2-normalised, so sum_i(q . d_i) = q . sum_i(d_i)
+        return float((query_vector @ column_sums)[0])
+
+    def preprocess(self, documents):
+        return [self.preprocessor.preprocess(doc) for doc in documents]
+
+    def transform(self, preprocessed_docs):
+        """Project already-preprocessed documents into the corpus TF-IDF space"""
+        if not self.is_built:
+            raise ValueError("Corpus index has not been built")
+        return self.feature_extractor.transform(preprocessed_docs)
+
+    def get_feature_names(self):
+        return self.feature_extractor.get_feature_names()
+
+    def params(self):
+        """Settings a saved index must match to be reused"""
+        return {
+            'max_features': self.max_features,
+            'ngram_range': list(self.ngram_range),
+            'fast': self.preprocessor.fast,
+            'preprocessor_version': TextPreprocessor.VERSION,
+            'source': self.source
+        }
+
+    def save(self, base_dir):
+        """Write the index as a new version under base_dir; returns the version directory"""
+        with self.lock:
+            if not self.is_built:
+                raise ValueError("Corpus index has not been built")
+            state = (self.documents, self.names, self.preprocessed_docs, self.matrix, self.counts,
+                     self.doc_freq, self.doc_ids, self._next_id, self.changes_since_build)
+            vocabulary = self.feature_extractor.get_feature_names()
+            idf = self.feature_extractor.vectorizer.idf_
+
+        documents, names, preprocessed_docs, matrix, counts, doc_freq, doc_ids, next_id, changes = state
+
+        def write(directory):
+            index_store.save_csr(matrix, os.path.join(directory, 'matrix'))
+            index_store.save_csr(counts, os.path.join(directory, 'counts'))
+            np.save(os.path.join(directory, 'doc_freq.npy'), np.asarray(doc_freq))
+            np.save(os.path.join(directory, 'idf.npy'), np.asarray(idf))
+            np.save(os.path.join(directory, 'doc_ids.npy'), np.array(doc_ids, dtype=np.int64))
+            index_store.save_texts(documents, directory, 'documents')
+            index_store.save_texts(preprocessed_docs, directory, 'preprocessed')
+            with open(os.path.join(directory, 'vocabulary.json'), 'w') as f:
+                json.dump(vocabulary, f)
+            with open(os.path.join(directory, 'names.json'), 'w') as f:
+                json.dump(names, f)
+            with open(os.path.join(directory, 'meta.json'), 'w') as f:
+                json.dump(dict(self.params(), format=index_store.FORMAT_VERSION, documents=len(documents),
+                               next_id=next_id, changes_since_build=changes), f)
+
+        return index_store.write_version(base_dir, write)
+
+    @classmethod
+    def load(cls, base_dir, workers=1, use_fingerprints=False, use_ann=False, expected=None):
+        """
+        Open the current saved version with memory-mapped arrays and texts.
+        Returns None if there is none, or its parameters differ from `expected` (see params()).
+        """
+        directory = index_store.current_version(base_dir)
+        if directory is None:
+            return None
+        meta = index_store.read_meta(directory)
+        if meta.get('format') != index_store.FORMAT_VERSION or meta.get('preprocessor_version') != TextPreprocessor.VERSION:
+            return None
+        if expected is not None and any(meta.get(key) != value for key, value in expected.items()):
+            return None
+
+        index = cls(max_features=meta['max_features'], ngram_range=tuple(meta['ngram_range']), workers=workers,
+                    fast=meta['fast'], use_fingerprints=use_fingerprints, use_ann=use_ann, source=meta.get('source'))
+        with open(os.path.join(directory, 'vocabulary.json')) as f:
+            vocabulary = {term: i for i, term in enumerate(json.load(f))}
+        with open(os.path.join(directory, 'names.json')) as f:
+            names = json.load(f)
+        index.feature_extractor.restore(vocabulary, np.load(os.path.join(directory, 'idf.npy')))
+
+        # Set directly rather than through _set_state, so nothing is recomputed or copied
+        index.documents = index_store.MappedTexts(directory, 'documents')
+        index.preprocessed_docs = index_store.MappedTexts(directory, 'preprocessed')
+        index.names = names
+        index.matrix = index_store.load_csr(os.path.join(directory, 'matrix'))
+        index.counts = index_store.load_csr(os.path.join(directory, 'counts'))
+        index.feature_extractor.tfidf_matrix = index.matrix
+        index.doc_freq = np.load(os.path.join(directory, 'doc_freq.npy'))
+        index.doc_ids = np.load(os.path.join(directory, 'doc_ids.npy')).tolist()
+        index._positions = {doc_id: pos for pos, doc_id in enumerate(index.doc_ids)}
+        index._next_id = meta['next_id']
+        index.changes_since_build = meta['changes_since_build']
+
+        if index.fingerprints is not None:
+            index.fingerprints.add_many(index.doc_ids, index.preprocessed_docs)
+        if index.ann is not None:
+            index.ann.build(index.matrix, index.doc_ids)
+        return index
@@ -0,0 +1,118 @@
+"""
+Fingerprint Index for PLAUGE
+Copy detection by document fingerprinting (winnowing, as used by MOSS):
+- Hash every k-word shingle of the preprocessed text
+- Keep the minimum hash of each sliding window as the document's fingerprints
+- Store fingerprints in an inverted index (fingerprint -> documents)
+
+A submission only touches the posting lists of its own fingerprints, so
+candidate retrieval cost depends on the submission, not the corpus size.
+"""
+
+import hashlib
+from collections import Counter
+
+
+def shingle_hashes(tokens, k=5):
+    """Stable 64-bit hash of every k-token shingle (Python's hash() is salted per process)"""
+    if not tokens:
+        return []
+    if len(tokens) < k:
+        k = len(tokens)
+    return [
+        int.from_bytes(hashlib.blake2b(' '.join(tokens[i:i + k]).encode('utf-8'), digest_size=8).digest(), 'big')
+        for i in range(len(tokens) - k + 1)
+    ]
+
+
+def winnow(hashes, window=4):
+    """Select the minimum hash of every window (rightmost on ties); returns the set of fingerprints"""
+    if len(hashes) <= window:
+        return {min(hashes)} if hashes else set()
+
+    fingerprints = set()
+    last_selected = -1
+    for start in range(len(hashes) - window + 1):
+        end = start + window
+        min_pos = start
+        for pos in range(start + 1, end):
+            if hashes[pos] <= hashes[min_pos]:
+                min_pos = pos
+        if min_pos != last_selected:
+            fingerprints.add(hashes[min_pos])
+            last_selected = min_pos
+    return fingerprints
+
+
+class FingerprintIndex:
+    """Inverted index from winnowed fingerprints to document keys"""
+
+    def __init__(self, k=5, window=4, max_doc_ratio=0.05, min_doc_limit=20):
+        self.k = k
+        self.window = window
+        # Fingerprints found in more documents than this are boilerplate and ignored at query time
+        self.max_doc_ratio = max_doc_ratio
+        self.min_doc_limit = min_doc_limit
+        self.postings = {}
+        self.doc_fingerprints = {}
+
+    def __len__(self):
+        return len(self.doc_fingerprints)
+
+    def __contains__(self, key):
+        return key in self.doc_fingerprints
+
+    def fingerprint(self, preprocessed_text):
+        return winnow(shingle_hashes(preprocessed_text.split(), self.k), self.window)
+
+    def clear(self):
+        self.postings = {}
+        self.doc_fingerprints = {}
+
+    def add(self, key, preprocessed_text):
+        if key in self.doc_fingerprints:
+            self.remove(key)
+        fingerprints = self.fingerprint(preprocessed_text)
+        self.doc_fingerprints[key] = fingerprints
+        for fp in fingerprints:
+            self.postings.setdefault(fp, set()).add(key)
+
+    def add_many(self, keys, preprocessed_docs):
+        for key, text in zip(keys, preprocessed_docs):
+            self.add(key, text)
+
+    def remove(self, key):
+        fingerprints = self.doc_fingerprints.pop(key, None)
+        if fingerprints is None:
+            return False
+        for fp in fingerprints:
+            docs = self.postings.get(fp)
+            if docs is not None:
+                docs.discard(key)
+                if not docs:
+                    del self.postings[fp]
+        return True
+
+    def query(self, preprocessed_text, top_k=50, min_shared=1):
+        """
+        Documents sharing fingerprints with the text, best first.
+        Returns a list of (key, shared_fingerprints, containment) where
+        containment is the fraction of the query's fingerprints found in that document.
+        """
+        fingerprints = self.fingerprint(preprocessed_text)
+        if not fingerprints:
+            return []
+
+        doc_limit = max(self.min_doc_limit, int(self.max_doc_ratio * len(self.doc_fingerprints)))
+        shared = Counter()
+        for fp in fingerprints:
+            docs = self.postings.get(fp)
+            if docs and len(docs) <= doc_limit:
+                shared.update(docs)
+
+        results = [
+            (key, count, count / len(fingerprints))
+            for key, count in shared.most_common(top_k)
+            if count >= min_shared
+        ]
+        return results
@@ -0,0 +1,135 @@
+"""
+On-disk corpus index format for PLAUGE
+A saved CorpusIndex is a directory of flat arrays that any number of
+processes can open with numpy memory maps (near-zero load time, and the
+OS shares the pages between workers):
+- matrix/, counts/     CSR data / indices / indptr / shape (.npy)
+- doc_freq.npy, idf.npy, doc_ids.npy
+- vocabulary.json      terms in column order
+- documents.bin, preprocessed.bin   UTF-8 texts back to back, with *_offsets.npy
+- names.json, meta.json             document metadata and index parameters
+
+Versions are written side by side and switched atomically through a CURRENT
+file, so readers never see a half-written index.
+"""
+
+import json
+import os
+import shutil
+import time
+from collections.abc import Sequence
+
+import numpy as np
+import scipy.sparse as sp
+
+
+FORMAT_VERSION = 1
+CURRENT_FILE = 'CURRENT'
+
+
+def save_csr(matrix, directory):
+    """Write a CSR matrix as data / indices / indptr / shape .npy files"""
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'data.npy'), matrix.data)
+    np.save(os.path.join(directory, 'indices.npy'), matrix.indices)
+    np.save(os.path.join(directory, 'indptr.npy'), matrix.indptr)
+    np.save(os.path.join(directory, 'shape.npy'), np.array(matrix.shape, dtype=np.int64))
+
+
+def load_csr_arrays(directory):
+    """Memory-mapped (data, indices, indptr, shape) of a save_csr() directory"""
+    return (
+        np.load(os.path.join(directory, 'data.npy'), mmap_mode='r'),
+        np.load(os.path.join(directory, 'indices.npy'), mmap_mode='r'),
+        np.load(os.path.join(directory, 'indptr.npy')),
+        tuple(int(n) for n in np.load(os.path.join(directory, 'shape.npy')))
+    )
+
+
+def load_csr(directory):
+    """CSR matrix whose data and indices stay memory-mapped"""
+    data, indices, indptr, shape = load_csr_arrays(directory)
+    return sp.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def csr_row_slice(arrays, start, stop):
+    """Rows [start, stop) of a memory-mapped CSR matrix, without copying data or indices"""
+    data, indices, indptr, shape = arrays
+    lo, hi = indptr[start], indptr[stop]
+    return sp.csr_matrix((data[lo:hi], indices[lo:hi], indptr[start:stop + 1] - lo), shape=(stop - start, shape[1]))
+
+
+def save_texts(texts, directory, name):
+    """Write texts as one UTF-8 blob plus an offsets array"""
+    offsets = [0]
+    with open(os.path.join(directory, f"{name}.bin"), 'wb') as f:
+        for text in texts:
+            encoded = text.encode('utf-8')
+            f.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), np.array(offsets, dtype=np.int64))
+
+
+class MappedTexts(Sequence):
+    """Read-only list of strings decoded on access from a memory-mapped blob"""
+
+    def __init__(self, directory, name):
+        self.offsets = np.load(os.path.join(directory, f"{name}_offsets.npy"))
+        path = os.path.join(directory, f"{name}.bin")
+        # np.memmap cannot map an empty file
+        self.blob = np.memmap(path, dtype=np.uint8, mode='r') if self.offsets[-1] else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __add__(self, other):
+        # Appending materialises the texts; the index then owns plain lists again
+        return list(self) + list(other)
+
+
+def current_version(base_dir):
+    """Directory of the active saved version, or None"""
+    try:
+        with open(os.path.join(base_dir, CURRENT_FILE)) as f:
+            directory = os.path.join(base_dir, f.read().strip())
+    except OSError:
+        return None
+    return directory if os.path.isdir(directory) else None
+
+
+def read_meta(directory):
+    with open(os.path.join(directory, 'meta.json')) as f:
+        return json.load(f)
+
+
+def write_version(base_dir, write, keep=1):
+    """
+    Call write(directory) on a fresh version directory, then make it current.
+    Older versions beyond `keep` are deleted (processes that mapped them keep
+    their pages until they reopen).
+    """
+    os.makedirs(base_dir, exist_ok=True)
+    name = f"v{time.time_ns()}"
+    directory = os.path.join(base_dir, name)
+    os.makedirs(directory)
+    write(directory)
+
+    pointer = os.path.join(base_dir, f"{CURRENT_FILE}.tmp{os.getpid()}")
+    with open(pointer, 'w') as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(base_dir, CURRENT_FILE))
+
+    # Only older versions are pruned; a newer one may still be being written by another process
+    versions = sorted(entry for entry in os.listdir(base_dir) if entry.startswith('v') and entry < name)
+    for old in versions[:max(0, len(versions) - (keep - 1))]:
+        shutil.rmtree(os.path.join(base_dir, old), ignore_errors=True)
+    return directory
@@ -1,13 +1,18 @@
+import os
 import re
 import string
 import nltk
+from functools import lru_cache
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 from nltk.stem import WordNetLemmatizer
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 import numpy as np
 
+from backend.utils.process_pool import new_process_pool
+
 
 def download_nltk_resources():
     resources = ['punkt', 'stopwords', 'wordnet', 'punkt_tab', 'averaged_perceptron_tagger', 'averaged_perceptron_tagger_eng']
@@ -18,10 +23,30 @@ def download_nltk_resources():
             pass
 
 
+# Fast path: after lowercasing, anything that is not [a-z0-9] or whitespace is dropped
+_FAST_STRIP_RE = re.compile(r'[^a-z0-9\s]')
+
+# Contractions NLTK's Treebank tokenizer still splits once punctuation is gone
+_TREEBANK_SPLITS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+
 class TextPreprocessor:
-    def __init__(self):
+    # Bump whenever preprocess() output changes, to invalidate on-disk caches
+    VERSION = '1'
+    
+    def __init__(self, fast=False, lemma_cache_size=100000):
+        self.fast = fast
         self.lemmatizer = WordNetLemmatizer()
         self.stop_words = set(stopwords.words('english'))
+        # Bounded memo of token -> lemma for the fast path
+        self._cached_lemma = lru_cache(maxsize=lemma_cache_size)(self.lemmatizer.lemmatize)
     
     def to_lowercase(self, text):
         return text.lower()
@@ -41,7 +66,27 @@ class TextPreprocessor:
     def lemmatize(self, tokens):
         return [self.lemmatizer.lemmatize(token) for token in tokens]
     
+    def fast_tokenize(self, text):
+        """Regex equivalent of lowercase + remove_punctuation + word_tokenize"""
+        tokens = []
+        for token in _FAST_STRIP_RE.sub('', text.lower()).split():
+            parts = _TREEBANK_SPLITS.get(token)
+            if parts is None:
+                tokens.append(token)
+            else:
+                tokens.extend(parts)
+        return tokens
+    
+    def preprocess_fast(self, text):
+        # Stopword removal and memoized lemmatization fused into one pass
+        stop_words = self.stop_words
+        lemma = self._cached_lemma
+        return ' '.join([lemma(token) for token in self.fast_tokenize(text) if token not in stop_words])
+    
     def preprocess(self, text):
+        if self.fast:
+            return self.preprocess_fast(text)
+        
         text = self.to_lowercase(text)
         text = self.remove_punctuation(text)
         tokens = self.tokenize(text)
@@ -50,6 +95,54 @@ class TextPreprocessor:
         return ' '.join(tokens)
 
 
+# Below this many documents a process pool costs more than it saves
+MIN_PARALLEL_DOCS = 32
+
+# Per-process preprocessor, created once by each pool worker
+_WORKER_PREPROCESSOR = None
+
+
+def _init_preprocess_worker(fast=False):
+    global _WORKER_PREPROCESSOR
+    _WORKER_PREPROCESSOR = TextPreprocessor(fast=fast)
+
+
+def _preprocess_chunk(documents):
+    return [_WORKER_PREPROCESSOR.preprocess(doc) for doc in documents]
+
+
+def preprocess_many(documents, workers=None, chunk_size=None, preprocessor=None):
+    """
+    Preprocess a batch of documents across a process pool.
+    Each worker builds its own lemmatizer and stopword set; documents are
+    sent in chunks and results come back in input order. workers=None uses
+    every core, workers=1 (or a small batch) runs serially in-process.
+    """
+    documents = list(documents)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    if workers <= 1 or len(documents) < MIN_PARALLEL_DOCS:
+        preprocessor = preprocessor or TextPreprocessor()
+        return [preprocessor.preprocess(doc) for doc in documents]
+    
+    if chunk_size is None:
+        # A few chunks per worker keeps the pool busy when document sizes vary
+        chunk_size = max(1, -(-len(documents) // (workers * 4)))
+    chunks = [documents[i:i + chunk_size] for i in range(0, len(documents), chunk_size)]
+    
+    fast = preprocessor.fast if preprocessor is not None else False
+    try:
+        with new_process_pool(workers, initializer=_init_preprocess_worker, initargs=(fast,)) as pool:
+            results = list(pool.map(_preprocess_chunk, chunks))
+    except Exception as e:
+        print(f"Warning: Parallel preprocessing failed ({e}), falling back to serial")
+        preprocessor = preprocessor or TextPreprocessor()
+        return [preprocessor.preprocess(doc) for doc in documents]
+    
+    return [tokens for chunk in results for tokens in chunk]
+
+
 class TfidfFeatureExtractor:
     def __init__(self, max_features=5000, ngram_range=(1, 2)):
         self.vectorizer = TfidfVectorizer(
@@ -64,14 +157,62 @@ class TfidfFeatureExtractor:
         self.tfidf_matrix = self.vectorizer.fit_transform(documents)
         return self.tfidf_matrix
     
+    def fit(self, documents):
+        self.vectorizer.fit(documents)
+        return self
+    
+    def transform(self, documents):
+        return self.vectorizer.transform(documents)
+    
+    def count(self, documents):
+        # Raw term counts over the fitted vocabulary (TF before IDF weighting)
+        return CountVectorizer.transform(self.vectorizer, documents)
+    
+    def reweight(self, counts, doc_freq, n_docs):
+        """Recompute IDF from document frequencies (sklearn's smooth_idf formula) and apply it to counts"""
+        idf = np.log((1 + n_docs) / (1 + np.asarray(doc_freq, dtype=np.float64))) + 1
+        self.vectorizer.idf_ = idf
+        self.tfidf_matrix = normalize(counts.multiply(idf).tocsr())
+        return self.tfidf_matrix
+    
+    def restore(self, vocabulary, idf):
+        """Make the vectorizer fitted from a saved vocabulary and IDF vector, without refitting"""
+        self.vectorizer.set_params(vocabulary=vocabulary)
+        self.vectorizer.fit([''])
+        self.vectorizer.set_params(vocabulary=None)
+        self.vectorizer.idf_ = idf
+        return self
+    
     def get_feature_names(self):
         return self.vectorizer.get_feature_names_out().tolist()
 
 
 class SimilarityCalculator:
     @staticmethod
-    def compute_cosine_similarity(tfidf_matrix):
-        return cosine_similarity(tfidf_matrix)
+    def compute_cosine_similarity(tfidf_matrix, other_matrix=None):
+        return cosine_similarity(tfidf_matrix, other_matrix)
+    
+    @staticmethod
+    def compute_query_similarity(query_matrix, corpus_matrix):
+        # TF-IDF rows are L2-normalised, so the sparse product is already the cosine similarity
+        return (query_matrix @ corpus_matrix.T).toarray()
+    
+    @staticmethod
+    def rerank_candidates(query_vector, corpus_matrix, candidates, top_k=None):
+        # Exact cosine over an (approximate) candidate shortlist: (corpus positions, similarities), best first
+        candidates = np.asarray(candidates, dtype=int)
+        similarities = SimilarityCalculator.compute_query_similarity(query_vector, corpus_matrix[candidates])[0]
+        order = SimilarityCalculator.top_k_indices(similarities, top_k)
+        return candidates[order], similarities[order]
+    
+    @staticmethod
+    def top_k_indices(similarities, top_k=None):
+        if top_k is None or top_k >= len(similarities):
+            return np.argsort(-similarities, kind='stable')
+        if top_k <= 0:
+            return np.array([], dtype=int)
+        candidates = np.argpartition(-similarities, top_k - 1)[:top_k]
+        return candidates[np.argsort(-similarities[candidates], kind='stable')]
     
     @staticmethod
     def similarity_to_percentage(similarity):
@@ -101,9 +242,14 @@ class PlagiarismDecision:
             return "\033[92m"
 
 
+# Lowest submission-vs-submission similarity reported for a batch (API and CLI alike)
+CROSS_PAIR_THRESHOLD = PlagiarismDecision.MEDIUM_THRESHOLD
+
+
 class PlagiarismDetector:
-    def __init__(self, max_features=5000):
-        self.preprocessor = TextPreprocessor()
+    def __init__(self, max_features=5000, workers=1, fast=False):
+        self.workers = workers
+        self.preprocessor = TextPreprocessor(fast=fast)
         self.feature_extractor = TfidfFeatureExtractor(max_features=max_features)
         self.similarity_calculator = SimilarityCalculator()
         self.documents = []
@@ -115,9 +261,9 @@ class PlagiarismDetector:
         if preprocessed_docs is not None:
             self.preprocessed_docs = preprocessed_docs
         else:
-            self.preprocessed_docs = [
-                self.preprocessor.preprocess(doc) for doc in documents
-            ]
+            self.preprocessed_docs = preprocess_many(
+                documents, workers=self.workers, preprocessor=self.preprocessor
+            )
     
     def analyze(self):
         if len(self.preprocessed_docs) < 2:
@@ -148,6 +294,78 @@ class PlagiarismDetector:
             'pairwise_results': pairwise_results
         }
     
+    def score_against(self, query_docs, corpus, top_k=10, preprocessed=False):
+        """
+        Compare each query document against a corpus without building the
+        full N x N similarity matrix. `corpus` is a fitted CorpusIndex or a
+        list of raw documents. Returns one list of top-k matches per query.
+        """
+        query_matrix, corpus = self._query_matrix(query_docs, corpus, preprocessed)
+        similarities = self.similarity_calculator.compute_query_similarity(query_matrix, corpus.matrix)
+        return self._top_matches(similarities, top_k)
+    
+    def score_batch(self, query_docs, corpus, top_k=10, preprocessed=False, cross_threshold=CROSS_PAIR_THRESHOLD):
+        """
+        score_against for a batch of submissions in one sparse multiply, plus
+        the similarity of every pair of submissions within the batch (in the
+        corpus vocabulary). Returns (per-query matches, cross pairs >= threshold).
+        """
+        query_matrix, corpus = self._query_matrix(query_docs, corpus, preprocessed)
+        similarities = self.similarity_calculator.compute_query_similarity(query_matrix, corpus.matrix)
+        return self._top_matches(similarities, top_k), self.cross_pairs(query_matrix, cross_threshold)
+    
+    @staticmethod
+    def cross_pairs(query_matrix, threshold=CROSS_PAIR_THRESHOLD):
+        """Pairs of rows (i < j) of a batch's TF-IDF matrix at or above threshold, most similar first"""
+        cross = SimilarityCalculator.compute_query_similarity(query_matrix, query_matrix)
+        rows, cols = np.triu_indices(query_matrix.shape[0], k=1)
+        keep = cross[rows, cols] >= threshold
+        
+        pairs = []
+        for i, j in zip(rows[keep], cols[keep]):
+            similarity = cross[i, j]
+            pairs.append({
+                'doc1_index': int(i),
+                'doc2_index': int(j),
+                'similarity_score': similarity,
+                'similarity_percentage': SimilarityCalculator.similarity_to_percentage(similarity),
+                'plagiarism_level': PlagiarismDecision.get_plagiarism_level(similarity)
+            })
+        pairs.sort(key=lambda pair: pair['similarity_score'], reverse=True)
+        return pairs
+    
+    def _query_matrix(self, query_docs, corpus, preprocessed):
+        from backend.ml_models.corpus_index import CorpusIndex
+        
+        if not isinstance(corpus, CorpusIndex):
+            corpus = CorpusIndex(
+                max_features=self.feature_extractor.vectorizer.max_features,
+                workers=self.workers,
+                fast=self.preprocessor.fast
+            ).build(list(corpus))
+        
+        if not preprocessed:
+            query_docs = preprocess_many(query_docs, workers=self.workers, preprocessor=self.preprocessor)
+        
+        return corpus.transform(query_docs), corpus
+    
+    def _top_matches(self, similarities, top_k):
+        results = []
+        for i, row in enumerate(similarities):
+            matches = []
+            for j in self.similarity_calculator.top_k_indices(row, top_k):
+                similarity = row[j]
+                matches.append({
+                    'query_index': i,
+                    'corpus_index': int(j),
+                    'similarity_score': similarity,
+                    'similarity_percentage': self.similarity_calculator.similarity_to_percentage(similarity),
+                    'plagiarism_level': PlagiarismDecision.get_plagiarism_level(similarity)
+                })
+            results.append(matches)
+        
+        return results
+    
     def print_results(self, results):
         RESET = "\033[0m"
         BOLD = "\033[1m"
@@ -0,0 +1,140 @@
+"""
+Sharded corpus similarity search for PLAUGE
+Splits the corpus TF-IDF matrix into row shards scored by separate processes:
+- The CSR arrays are written once as .npy files and memory-mapped by every
+  worker, so shards share the page cache instead of each holding a copy
+- Each worker returns its local top-k plus score totals; the parent merges them
+- A new matrix (index rebuilt or updated) is republished on first use
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+from backend.ml_models.plagiarism_detector import SimilarityCalculator
+from backend.ml_models.index_store import save_csr, load_csr_arrays, csr_row_slice
+from backend.utils.process_pool import new_process_pool
+
+
+def summarize_scores(similarities, top_k, offset=0):
+    """Top-k hits of one similarity row, plus sum / max / count of its integer percentages"""
+    top = SimilarityCalculator.top_k_indices(similarities, top_k)
+    # Vectorised int(similarity_to_percentage(s)); similarities are never negative, so floor == int()
+    scores = np.floor(np.round(np.asarray(similarities, dtype=np.float64) * 100, 2)).astype(np.int64)
+    return {
+        'indices': top + offset,
+        'similarities': similarities[top],
+        'score_sum': int(scores.sum()),
+        'score_max': int(scores.max()) if len(scores) else 0,
+        'count': len(scores)
+    }
+
+
+def merge_summaries(summaries, top_k):
+    """Combine per-shard summaries of the same query into one"""
+    indices = np.concatenate([s['indices'] for s in summaries])
+    similarities = np.concatenate([s['similarities'] for s in summaries])
+    top = SimilarityCalculator.top_k_indices(similarities, top_k)
+    return {
+        'indices': indices[top],
+        'similarities': similarities[top],
+        'score_sum': sum(s['score_sum'] for s in summaries),
+        'score_max': max((s['score_max'] for s in summaries if s['count']), default=0),
+        'count': sum(s['count'] for s in summaries)
+    }
+
+
+# Per-process memory maps, keyed by matrix directory (only the latest is kept)
+_WORKER_ARRAYS = {}
+
+
+def _score_shard(task):
+    directory, start, stop, query, top_k = task
+    if directory not in _WORKER_ARRAYS:
+        _WORKER_ARRAYS.clear()
+        _WORKER_ARRAYS[directory] = load_csr_arrays(directory)
+    shard = csr_row_slice(_WORKER_ARRAYS[directory], start, stop)
+    similarities = SimilarityCalculator.compute_query_similarity(query, shard)
+    return [summarize_scores(row, top_k, offset=start) for row in similarities]
+
+
+class ShardedSearcher:
+    """Scores queries against a corpus matrix split across worker processes"""
+
+    def __init__(self, shards=None, base_dir=None):
+        self.shards = shards or os.cpu_count() or 1
+        self.base_dir = base_dir
+        self.pool = None
+        self.matrix = None
+        self.directory = None
+        self.bounds = []
+        self.version = 0
+        # Searches still running per matrix directory; a replaced directory is removed by the last one
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def publish(self, matrix):
+        """Write a new corpus matrix for the workers and compute nnz-balanced shard bounds"""
+        if self.base_dir is None:
+            self.base_dir = tempfile.mkdtemp(prefix='plauge-shards-')
+            atexit.register(self.close)
+
+        self.version += 1
+        directory = os.path.join(self.base_dir, f"v{self.version}")
+        matrix = matrix.tocsr()
+        save_csr(matrix, directory)
+
+        # Equal non-zeros per shard rather than equal rows, so shards take similar time
+        n_rows = matrix.shape[0]
+        shards = max(1, min(self.shards, n_rows))
+        cuts = np.searchsorted(matrix.indptr, np.linspace(0, matrix.nnz, shards + 1)[1:-1])
+        edges = [0] + sorted(set(int(c) for c in cuts if 0 < c < n_rows)) + [n_rows]
+
+        previous = self.directory
+        self.directory = directory
+        self.bounds = list(zip(edges[:-1], edges[1:]))
+        self.matrix = matrix
+        if previous and not self.in_flight.get(previous):
+            # Workers mapping the old files keep them alive until they switch over
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def search(self, matrix, query_matrix, top_k=10):
+        """One merged summary (see summarize_scores) per query row"""
+        with self.lock:
+            if matrix is not self.matrix:
+                self.publish(matrix)
+            if self.pool is None:
+                self.pool = new_process_pool(self.shards)
+            pool, directory, bounds = self.pool, self.directory, self.bounds
+            self.in_flight[directory] = self.in_flight.get(directory, 0) + 1
+
+        try:
+            query_matrix = sp.csr_matrix(query_matrix)
+            tasks = [(directory, start, stop, query_matrix, top_k) for start, stop in bounds]
+            per_shard = list(pool.map(_score_shard, tasks))
+        finally:
+            self._release(directory)
+        return [merge_summaries([shard[row] for shard in per_shard], top_k) for row in range(query_matrix.shape[0])]
+
+    def _release(self, directory):
+        # A search finished: drop its matrix version if it was replaced meanwhile and nothing else uses it
+        with self.lock:
+            self.in_flight[directory] -= 1
+            if self.in_flight[directory]:
+                return
+            del self.in_flight[directory]
+            if directory != self.directory:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def close(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+            if self.base_dir:
+                shutil.rmtree(self.base_dir, ignore_errors=True)
@@ -0,0 +1,74 @@
+"""
+Shared HTTP client for PLAUGE
+One pooled requests.Session per process, used by the web searchers and the
+corpus builder fetchers:
+- Per-host connection pools with keep-alive (no new TCP+TLS handshake per call)
+- Retry with exponential backoff on connection errors, 429 and 5xx
+- Default timeout and User-Agent, overridable per call
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_TIMEOUT = 10
+USER_AGENT = 'PlagiarismDetector/1.0'
+
+# Number of distinct hosts to keep pools for, and connections kept per host
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 10
+
+# Retries for transient failures; sleeps backoff * 2^(retry - 1) between tries
+RETRY_TOTAL = 2
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def create_session(retries=RETRY_TOTAL, backoff=RETRY_BACKOFF,
+                   pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """Build a requests.Session with pooled, retrying adapters for http and https"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=('GET', 'HEAD'),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def get_session():
+    """Process-wide shared session, created on first use"""
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = create_session()
+    return _SESSION
+
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """GET through the shared pooled session"""
+    return get_session().get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+
+
+def close_session():
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+            _SESSION = None
@@ -0,0 +1,23 @@
+"""
+Process pools for PLAUGE
+Every ProcessPoolExecutor (AI detection, PDF pages, corpus shards,
+preprocessing) is created through new_process_pool():
+- Workers are started with 'spawn' instead of Linux's default 'fork'. Pools
+  are created lazily from request threads, next to job, ingestor, watcher
+  and stage threads; a forked child inherits any lock one of those threads
+  held at that instant (logging, imports, SQLite) and can deadlock on it
+- Spawned workers import what they need themselves, so scripts using them
+  keep their `if __name__ == "__main__":` guard
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+POOL_START_METHOD = 'spawn'
+
+
+def new_process_pool(max_workers, **kwargs):
+    """ProcessPoolExecutor whose workers are started with POOL_START_METHOD"""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(POOL_START_METHOD),
+                               **kwargs)
@@ -0,0 +1,179 @@
+"""
+Document text extraction for PLAUGE
+Reads uploads straight from their stream:
+- Text is yielded page by page / paragraph by paragraph / chunk by chunk
+- Upload size and PDF page count are capped before any parsing work
+- Large PDFs have their pages extracted in a shared process pool, which
+  reads them from one temp file instead of being sent the bytes per task
+"""
+
+import codecs
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import docx
+from PyPDF2 import PdfReader
+
+from backend.utils.process_pool import new_process_pool
+
+
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+MAX_PDF_PAGES = 500
+
+# PDFs with at least this many pages are split across processes (PDF_WORKERS=None uses every core).
+# The pool is created on first use, sized by that call's workers, and reused afterwards.
+PARALLEL_PDF_PAGES = 40
+PDF_WORKERS = None
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size or page limits"""
+
+
+def size_limit_error(max_bytes):
+    return DocumentTooLargeError(f"Document is larger than the {max_bytes / (1024 * 1024):g} MB limit")
+
+
+def open_bounded(stream, max_bytes=MAX_UPLOAD_BYTES):
+    """Seekable stream over the upload, refusing anything larger than max_bytes"""
+    seekable = getattr(stream, 'seekable', None)
+    if seekable is not None and seekable():
+        start = stream.tell()
+        size = stream.seek(0, io.SEEK_END) - start
+        stream.seek(start)
+        if size > max_bytes:
+            raise size_limit_error(max_bytes)
+        return stream
+
+    # Non-seekable stream: buffer it, but stop as soon as the limit is crossed
+    buffer = io.BytesIO()
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer.write(chunk)
+        if buffer.tell() > max_bytes:
+            raise size_limit_error(max_bytes)
+    buffer.seek(0)
+    return buffer
+
+
+def iter_txt(stream, max_bytes=MAX_UPLOAD_BYTES):
+    """Decode a UTF-8 upload chunk by chunk"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    total = 0
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise size_limit_error(max_bytes)
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+_PDF_POOL = None
+_PDF_POOL_LOCK = threading.Lock()
+
+
+def get_pdf_pool(workers):
+    """Process pool shared by every parallel PDF extraction (created once)"""
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is None:
+            _PDF_POOL = new_process_pool(workers)
+        return _PDF_POOL
+
+
+def reset_pdf_pool(pool):
+    """Shut down a broken pool so the next PDF starts a fresh one"""
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is pool:
+            _PDF_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_pdf_pages(task):
+    path, start, stop = task
+    with open(path, 'rb') as f:
+        reader = PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf(stream, max_bytes=MAX_UPLOAD_BYTES, max_pages=MAX_PDF_PAGES, workers=PDF_WORKERS):
+    """Yield the text of each PDF page in order"""
+    stream = open_bounded(stream, max_bytes)
+    start = stream.tell()
+    reader = PdfReader(stream)
+    page_count = len(reader.pages)
+    if page_count > max_pages:
+        raise DocumentTooLargeError(f"PDF has {page_count} pages, the limit is {max_pages}")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    done = 0
+    if workers > 1 and page_count >= PARALLEL_PDF_PAGES:
+        step = max(1, -(-page_count // (workers * 2)))
+        pool, path, futures = None, None, []
+        try:
+            # Workers open the PDF from disk; a task only carries (path, page range)
+            stream.seek(start)
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+                path = tmp.name
+                shutil.copyfileobj(stream, tmp)
+            pool = get_pdf_pool(workers)
+            futures = [pool.submit(_extract_pdf_pages, (path, i, min(i + step, page_count)))
+                       for i in range(0, page_count, step)]
+            for future in futures:
+                for text in future.result():
+                    yield text
+                    done += 1
+        except BrokenProcessPool as e:
+            print(f"Warning: PDF extraction process pool broke ({e}), restarting it and continuing serially")
+            reset_pdf_pool(pool)
+        except Exception as e:
+            print(f"Warning: Parallel PDF extraction failed ({e}), continuing serially")
+        finally:
+            for future in futures:
+                future.cancel()
+            if path:
+                os.remove(path)
+
+    for i in range(done, page_count):
+        yield reader.pages[i].extract_text() or ""
+
+
+def iter_docx(stream, max_bytes=MAX_UPLOAD_BYTES):
+    """Yield each DOCX paragraph followed by a newline"""
+    document = docx.Document(open_bounded(stream, max_bytes))
+    for para in document.paragraphs:
+        yield para.text + "\n"
+
+
+def iter_document_text(file, max_bytes=MAX_UPLOAD_BYTES, max_pages=MAX_PDF_PAGES, workers=PDF_WORKERS):
+    """Stream the text of an uploaded .txt, .pdf or .docx file"""
+    filename = file.filename.lower()
+    stream = getattr(file, 'stream', file)
+
+    if filename.endswith('.txt'):
+        return iter_txt(stream, max_bytes)
+    elif filename.endswith('.pdf'):
+        return iter_pdf(stream, max_bytes, max_pages, workers)
+    elif filename.endswith('.docx'):
+        return iter_docx(stream, max_bytes)
+    else:
+        raise ValueError(f"Unsupported file type: {filename}")
+
+
+def extract_text(file, **limits):
+    """Full text of an upload, joined once instead of grown by repeated concatenation"""
+    return ''.join(iter_document_text(file, **limits))
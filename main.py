@@ -20,6 +20,7 @@ def main():
     print("""
     Commands:
         python main.py check       - Check documents for plagiarism
+                                     (optional: min. similarity of reported submission pairs, e.g. 0.3)
         python main.py corpus      - Manage corpus database
         python main.py demo        - Run demo with sample documents
     """)
@@ -29,7 +30,7 @@ def main():
         
         if cmd == 'check':
             from backend.ml_models.check_against_corpus import main as check_main
-            check_main()
+            check_main(float(sys.argv[2]) if len(sys.argv) > 2 else None)
         elif cmd == 'corpus':
             from backend.database.corpus_builder import main as corpus_main
             corpus_main()
@@ -0,0 +1,100 @@
+"""
+Benchmark ANN candidate retrieval (LSA + IVF) against exhaustive cosine search.
+Queries are perturbed copies of corpus documents; for each n_probe setting the
+shortlist is re-ranked exactly and compared with the exhaustive top-k.
+Reports recall@k and per-query latency.
+
+Usage:
+    python tools/benchmark_ann.py                # Bundled corpus, 100 queries
+    python tools/benchmark_ann.py 20             # Corpus scaled up 20x with perturbed copies
+    python tools/benchmark_ann.py 20 500         # ... and 500 queries
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ml_models.corpus_index import CorpusIndex
+from backend.ml_models.plagiarism_detector import SimilarityCalculator, TextPreprocessor, preprocess_many
+
+
+CORPUS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'corpus')
+
+TOP_K = 10
+N_CANDIDATES = 200
+N_PROBES = [1, 2, 4, 8, 16, 32]
+# Fraction of words dropped from a document to make a scaled copy / a query
+DROP_RATE = 0.3
+
+
+def load_corpus_texts(folder):
+    documents = []
+    for root, _, files in os.walk(folder):
+        for filename in sorted(files):
+            if filename.endswith('.txt'):
+                with open(os.path.join(root, filename), 'r', encoding='utf-8', errors='ignore') as f:
+                    documents.append(f.read())
+    return documents
+
+
+def perturb(text, rng):
+    words = text.split()
+    keep = rng.random(len(words)) >= DROP_RATE
+    return ' '.join(word for word, kept in zip(words, keep) if kept)
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rng = np.random.default_rng(0)
+
+    documents = load_corpus_texts(CORPUS_FOLDER)
+    if not documents:
+        print(f"❌ No corpus documents found in '{CORPUS_FOLDER}'")
+        return
+
+    # Preprocess once, then scale up with perturbed copies of the preprocessed text
+    preprocessed = preprocess_many(documents, preprocessor=TextPreprocessor(fast=True))
+    preprocessed = preprocessed + [perturb(doc, rng) for _ in range(scale - 1) for doc in preprocessed]
+    print(f"📚 {len(preprocessed):,} documents ({len(documents)} x{scale}), {n_queries} queries")
+
+    start = time.perf_counter()
+    index = CorpusIndex(max_features=5000, fast=True, use_ann=True)
+    index.build(preprocessed, preprocessed_docs=preprocessed)
+    print(f"🏗️  Built TF-IDF + ANN index in {time.perf_counter() - start:.2f}s "
+          f"({len(index.ann.centroids)} lists, {index.ann.vectors.shape[1]} dimensions)")
+
+    queries = [perturb(preprocessed[i], rng) for i in rng.choice(len(preprocessed), n_queries)]
+    query_matrix = index.transform(queries)
+
+    start = time.perf_counter()
+    exact = []
+    for i in range(n_queries):
+        similarities = SimilarityCalculator.compute_query_similarity(query_matrix[i], index.matrix)[0]
+        exact.append(set(SimilarityCalculator.top_k_indices(similarities, TOP_K).tolist()))
+    exhaustive_ms = (time.perf_counter() - start) * 1000 / n_queries
+
+    print("\n" + "=" * 60)
+    print(f"   {'Method':<18}{'Recall@' + str(TOP_K):>12}{'ms/query':>12}{'Speedup':>10}")
+    print(f"   {'Exhaustive':<18}{1.0:>12.3f}{exhaustive_ms:>12.2f}{1.0:>9.1f}x")
+    for n_probe in N_PROBES:
+        if n_probe > len(index.ann.centroids):
+            break
+        hits = 0
+        start = time.perf_counter()
+        for i in range(n_queries):
+            candidates = index.ann.search(query_matrix[i], n_candidates=N_CANDIDATES, n_probe=n_probe)[0]
+            top, _ = SimilarityCalculator.rerank_candidates(query_matrix[i], index.matrix, candidates, TOP_K)
+            hits += len(exact[i] & set(top.tolist()))
+        ann_ms = (time.perf_counter() - start) * 1000 / n_queries
+        recall = hits / (n_queries * min(TOP_K, len(preprocessed)))
+        print(f"   {'IVF n_probe=' + str(n_probe):<18}{recall:>12.3f}{ann_ms:>12.2f}{exhaustive_ms / ann_ms:>9.1f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
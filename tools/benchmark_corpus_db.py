@@ -0,0 +1,88 @@
+"""
+Benchmark bulk paper ingestion into the corpus database.
+Inserts synthetic papers into a throwaway database one add_paper() call
+(and commit) at a time with SQLite's default rollback journal (the old
+ingestion path), then through a single add_papers() transaction in WAL mode,
+and re-ingests the bulk set to check every row comes back as a duplicate.
+
+Usage:
+    python tools/benchmark_corpus_db.py              # 100,000 papers (per-row pass on 2,000)
+    python tools/benchmark_corpus_db.py 20000 500    # 20,000 bulk papers, 500 per-row
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database.corpus_builder import CorpusDatabase, PAPER_INSERTED, PAPER_DUPLICATE
+
+
+VOCABULARY = ("learning model neural network data training graph language transformer attention "
+              "detection plagiarism corpus retrieval embedding semantic similarity evaluation benchmark "
+              "optimization gradient inference dataset feature classification clustering").split()
+
+
+def synthetic_papers(count, seed):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            'title': f"Synthetic paper {seed}-{i}: {' '.join(rng.choices(VOCABULARY, k=6))}",
+            'abstract': ' '.join(rng.choices(VOCABULARY, k=rng.randint(80, 200))),
+            'source': rng.choice(['arxiv', 'semantic_scholar', 'crossref', 'openalex']),
+            'source_id': str(i),
+            'authors': 'A. Author, B. Author',
+            'year': rng.randint(1990, 2025),
+            'topics': 'benchmark',
+            'url': f"https://example.org/paper/{seed}/{i}"
+        }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    per_row_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CorpusDatabase(os.path.join(tmp, 'per_row.db'))
+        db.conn.execute('PRAGMA journal_mode=DELETE')
+        db.conn.execute('PRAGMA synchronous=FULL')
+        start = time.perf_counter()
+        for paper in synthetic_papers(per_row_count, seed=1):
+            db.add_paper(**paper)
+        per_row_time = time.perf_counter() - start
+        db.close()
+
+        db = CorpusDatabase(os.path.join(tmp, 'bulk.db'))
+        papers = list(synthetic_papers(count, seed=2))
+        start = time.perf_counter()
+        statuses = db.add_papers(papers)
+        bulk_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        repeat = db.add_papers(papers)
+        repeat_time = time.perf_counter() - start
+        stored = db.get_stats()['total_papers']
+        db.close()
+
+    per_row_rate = per_row_count / per_row_time
+    bulk_rate = count / bulk_time
+
+    print("\n" + "=" * 60)
+    print(f"   add_paper (per row):  {per_row_count:>8,} papers {per_row_time:8.2f}s  {per_row_rate:10,.0f} papers/sec")
+    print(f"   add_papers (bulk):    {count:>8,} papers {bulk_time:8.2f}s  {bulk_rate:10,.0f} papers/sec")
+    print(f"   Re-ingest (all dup):  {count:>8,} papers {repeat_time:8.2f}s  {count / repeat_time:10,.0f} papers/sec")
+    print(f"   Speedup:              {bulk_rate / per_row_rate:8.1f}x")
+    print("=" * 60)
+
+    if statuses.count(PAPER_INSERTED) != count or stored != count or repeat.count(PAPER_DUPLICATE) != count:
+        print(f"❌ Unexpected statuses: {statuses.count(PAPER_INSERTED)} inserted, {stored} stored, "
+              f"{repeat.count(PAPER_DUPLICATE)} duplicates on re-ingest")
+        sys.exit(1)
+    print(f"✅ {count:,} inserted, {count:,} reported as duplicates on re-ingest")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark the fast TextPreprocessor path against the standard NLTK path.
+Checks that both produce identical output on every corpus document and
+reports throughput in tokens/sec.
+
+Usage:
+    python tools/benchmark_preprocess.py             # Whole bundled corpus
+    python tools/benchmark_preprocess.py 3           # Repeat each pass 3 times
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ml_models.plagiarism_detector import TextPreprocessor, download_nltk_resources
+
+
+CORPUS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'corpus')
+
+
+def load_corpus_texts(folder):
+    documents = []
+    for root, _, files in os.walk(folder):
+        for filename in sorted(files):
+            if filename.endswith('.txt'):
+                with open(os.path.join(root, filename), 'r', encoding='utf-8', errors='ignore') as f:
+                    documents.append(f.read())
+    return documents
+
+
+def time_pass(preprocessor, documents, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        output = [preprocessor.preprocess(doc) for doc in documents]
+    return output, time.perf_counter() - start
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+
+    download_nltk_resources()
+
+    documents = load_corpus_texts(CORPUS_FOLDER)
+    if not documents:
+        print(f"❌ No corpus documents found in '{CORPUS_FOLDER}'")
+        return
+
+    input_tokens = sum(len(doc.split()) for doc in documents) * repeats
+    print(f"📚 {len(documents)} documents, {input_tokens:,} input tokens x{repeats}")
+
+    standard_output, standard_time = time_pass(TextPreprocessor(), documents, repeats)
+    fast_output, fast_time = time_pass(TextPreprocessor(fast=True), documents, repeats)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(standard_output, fast_output)) if a != b]
+
+    print("\n" + "=" * 60)
+    print(f"   Standard: {standard_time:8.2f}s  {input_tokens / standard_time:12,.0f} tokens/sec")
+    print(f"   Fast:     {fast_time:8.2f}s  {input_tokens / fast_time:12,.0f} tokens/sec")
+    print(f"   Speedup:  {standard_time / fast_time:8.1f}x")
+    print("=" * 60)
+
+    if mismatches:
+        print(f"❌ Output differs on {len(mismatches)} documents (first index: {mismatches[0]})")
+        sys.exit(1)
+    print("✅ Identical output on all documents")
+
+
+if __name__ == "__main__":
+    main()